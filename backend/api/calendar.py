@@ -11,6 +11,8 @@ from database import get_db
 from models import Visitor, Approval, Resident
 from schemas import CalendarEvent, CalendarSyncRequest, CalendarSyncResponse
 from services.time_validator import parse_time_string, calculate_time_window
+from services.approval_cache import approval_cache
+from services.notification_service import notification_service
 from utils.audit_logger import log_action
 from core import settings
 
@@ -83,6 +85,8 @@ def sync_calendar(
     
     events_processed = 0
     approvals_created = 0
+    created = []
+    db.expire_on_commit = False  # Events are published from these rows after commit; skip the refresh SELECTs
     
     for event in request.events:
         events_processed += 1
@@ -122,6 +126,7 @@ def sync_calendar(
             approved_at=datetime.utcnow()
         )
         db.add(approval)
+        created.append((approval, visitor))
         
         # Log the action
         log_action(
@@ -134,6 +139,9 @@ def sync_calendar(
         approvals_created += 1
     
     db.commit()
+    approval_cache.invalidate()
+    for approval, visitor in created:
+        notification_service.publish_approval("approved", approval, visitor, resident)
     
     return CalendarSyncResponse(
         success=True,
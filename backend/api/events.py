@@ -0,0 +1,93 @@
+"""
+Realtime Approval Events (Server-Sent Events)
+GET /api/events/gate                    - All approval changes, for guard tablets
+GET /api/events/residents/{resident_id} - Approval changes for one resident
+
+Reconnecting clients send Last-Event-ID (header, or ?last_event_id= for the
+first connect) and receive the events they missed. A `resync` event means
+the gap is too old to replay and the client should refetch over REST.
+"""
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from core import settings
+from services.notification_service import (
+    notification_service, Event, GATE_TOPIC, resident_topic
+)
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx response buffering
+}
+
+
+def format_sse(event: Event) -> str:
+    """Serialize an event in text/event-stream format"""
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+
+async def event_stream(topic: str, last_event_id: Optional[int]):
+    """Replay missed events, then stream live ones with keep-alive comments"""
+    with notification_service.subscribe(topic, last_event_id) as subscription:
+        yield f"retry: {settings.events_retry_ms}\n\n"
+
+        if subscription.resync:
+            yield "event: resync\ndata: {}\n\n"
+        for event in subscription.replay:
+            yield format_sse(event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.events_heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            if event is None:
+                # Client fell behind; closing makes it reconnect and replay
+                return
+            yield format_sse(event)
+
+
+def _parse_event_id(header_value: Optional[str], query_value: Optional[str]) -> Optional[int]:
+    value = header_value or query_value
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@router.get("/gate")
+async def gate_events(
+    last_event_id: Optional[str] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Stream every approval change to the guard app"""
+    return StreamingResponse(
+        event_stream(GATE_TOPIC, _parse_event_id(last_event_id_header, last_event_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/residents/{resident_id}")
+async def resident_events(
+    resident_id: int,
+    last_event_id: Optional[str] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Stream approval changes for one resident (new requests to approve, etc.)"""
+    return StreamingResponse(
+        event_stream(resident_topic(resident_id), _parse_event_id(last_event_id_header, last_event_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
@@ -1,32 +1,70 @@
 """
 Face Detection & Verification API Endpoints
 POST /api/face/detect     — Detect faces in an uploaded image
+POST /api/face/detect-batch — Detect faces in several frames and pick the best one
 POST /api/face/verify     — Compare two face images
 POST /api/face/capture    — Capture & store visitor photo
+POST /api/face/verify-identity — Compare a live capture with a visitor's or resident's stored photo
+POST /api/face/identify   — Match a live capture against today's expected visitors
+
+OpenCV work runs on the bounded face worker pool; a saturated pool answers 503 + Retry-After.
 """
+import asyncio
 import base64
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse
-
-from services.face_service import detect_faces, verify_faces, save_visitor_photo, crop_face, draw_face_boxes
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import settings
+from database import get_async_db
+from models import Visitor, Resident
+from services.face_descriptors import photo_filename, PHOTO_URL_PREFIX
+from services.face_identify import identify_face, DEFAULT_TOP_K
+from services.face_pool import face_pool, FacePoolSaturated
+from services.photo_manager import read_upload, PhotoTooLarge
+from services.face_service import (
+    detect_and_annotate, detect_frame, best_frame_index,
+    verify_faces, verify_against_photo, capture_visitor_photo
+)
 
 router = APIRouter(prefix="/api/face", tags=["face"])
 
 
+async def run_face_job(fn, *args):
+    """Run CPU-bound face work off the event loop"""
+    try:
+        return await face_pool.run(fn, *args)
+    except FacePoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Face processing is busy, please retry",
+            headers={"Retry-After": str(settings.face_retry_after_seconds)},
+        )
+
+
+async def read_image(photo: UploadFile) -> bytes:
+    """Read an uploaded image in chunks, rejecting oversized uploads mid-stream"""
+    try:
+        return await read_upload(photo)
+    except PhotoTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
 @router.post("/detect")
 async def detect(photo: UploadFile = File(...)):
     """
     Detect faces in an uploaded image.
     Returns face count, bounding boxes, and annotated image.
     """
-    image_bytes = await photo.read()
+    image_bytes = await read_image(photo)
     if not image_bytes:
         raise HTTPException(status_code=400, detail="Empty image")
 
-    result = detect_faces(image_bytes)
+    # Decode and detect once; the annotated image reuses the detections
+    result, annotated_bytes = await run_face_job(detect_and_annotate, image_bytes)
 
     # Also return annotated image as base64 for display
-    annotated_bytes = draw_face_boxes(image_bytes)
     annotated_b64 = None
     if annotated_bytes:
         annotated_b64 = base64.b64encode(annotated_bytes).decode("utf-8")
@@ -37,6 +75,38 @@ async def detect(photo: UploadFile = File(...)):
     }
 
 
+@router.post("/detect-batch")
+async def detect_batch(photos: List[UploadFile] = File(...)):
+    """
+    Detect faces in a burst of frames from one arrival.
+    Frames are processed in parallel on the face pool; best_frame_index is the
+    frame with the largest, sharpest face (None if no frame has a face).
+    """
+    if len(photos) > settings.face_batch_max_frames:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.face_batch_max_frames} frames per request"
+        )
+
+    frames = [await read_image(photo) for photo in photos]
+    if not all(frames):
+        raise HTTPException(status_code=400, detail="Empty image")
+
+    results = await asyncio.gather(
+        *(run_face_job(detect_frame, image_bytes) for image_bytes in frames),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    return {
+        "frames": [{"index": i, **result} for i, result in enumerate(results)],
+        "frame_count": len(results),
+        "best_frame_index": best_frame_index(results),
+    }
+
+
 @router.post("/verify")
 async def verify(
     photo1: UploadFile = File(...),
@@ -46,42 +116,98 @@ async def verify(
     Verify if two photos contain the same person.
     Photo1 = live capture, Photo2 = stored/ID photo.
     """
-    bytes1 = await photo1.read()
-    bytes2 = await photo2.read()
+    bytes1 = await read_image(photo1)
+    bytes2 = await read_image(photo2)
 
     if not bytes1 or not bytes2:
         raise HTTPException(status_code=400, detail="Both images are required")
 
-    result = verify_faces(bytes1, bytes2)
+    result = await run_face_job(verify_faces, bytes1, bytes2)
     return result
 
 
 @router.post("/capture")
 async def capture(
     photo: UploadFile = File(...),
-    visitor_id: int = Form(...)
+    visitor_id: int = Form(...),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Capture and store a visitor photo. Detects face first.
+    The photo becomes the visitor's photo_url (used by verify-identity and identify).
     """
-    image_bytes = await photo.read()
+    if not await db.get(Visitor, visitor_id):
+        raise HTTPException(status_code=404, detail="Visitor not found")
+
+    image_bytes = await read_image(photo)
     if not image_bytes:
         raise HTTPException(status_code=400, detail="Empty image")
 
-    detection = detect_faces(image_bytes)
+    # Detect, then save the original photo and its face descriptor, from a single decode
+    detection, filename = await run_face_job(capture_visitor_photo, image_bytes, visitor_id)
     if not detection["detected"]:
         raise HTTPException(status_code=400, detail="No face detected in photo")
 
-    # Crop face
-    cropped = crop_face(image_bytes)
-
-    # Save the original photo
-    filename = save_visitor_photo(image_bytes, visitor_id)
-
     return {
         "success": True,
         "filename": filename,
+        "photo_url": f"{PHOTO_URL_PREFIX}{filename}",
         "visitor_id": visitor_id,
         "faces_detected": detection["count"],
         "face_data": detection["faces"][0] if detection["faces"] else None,
     }
+
+
+@router.post("/verify-identity")
+async def verify_identity(
+    photo: UploadFile = File(...),
+    visitor_id: Optional[int] = Form(None),
+    resident_id: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Verify a live capture against the stored photo of a visitor or resident.
+    The stored photo's descriptor is precomputed, so only the capture is processed.
+    """
+    if (visitor_id is None) == (resident_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of visitor_id or resident_id")
+
+    if visitor_id is not None:
+        person = await db.get(Visitor, visitor_id)
+        if not person:
+            raise HTTPException(status_code=404, detail="Visitor not found")
+    else:
+        person = await db.get(Resident, resident_id)
+        if not person:
+            raise HTTPException(status_code=404, detail="Resident not found")
+
+    filename = photo_filename(person.photo_url)
+    if not filename:
+        raise HTTPException(status_code=404, detail="No stored photo on file")
+
+    image_bytes = await read_image(photo)
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty image")
+
+    result = await run_face_job(verify_against_photo, image_bytes, filename)
+    return {
+        **result,
+        "visitor_id": visitor_id,
+        "resident_id": resident_id,
+    }
+
+
+@router.post("/identify")
+async def identify(
+    photo: UploadFile = File(...),
+    top_k: int = Form(DEFAULT_TOP_K, ge=1, le=50)
+):
+    """
+    Identify a live capture among visitors with an approval valid now or
+    requested today. Returns the top_k candidates, best first.
+    """
+    image_bytes = await read_image(photo)
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty image")
+
+    return await run_face_job(identify_face, image_bytes, top_k)
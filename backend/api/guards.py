@@ -3,47 +3,48 @@ Guard Operations API Endpoints
 """
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
-from database import get_db
-from models import Guard, Approval, Visitor, Resident
+from database import get_db, get_async_db
+from models import Guard, Approval
+from services.approval_cache import approval_cache
+from services.notification_service import notification_service
+from services.visitor_lookup import search_visitors_with_latest_approval
+from services.visitor_search import DEFAULT_SEARCH_LIMIT
 from utils.audit_logger import log_action
 
 router = APIRouter(prefix="/api/guards", tags=["guards"])
 
 
 @router.get("/active-approvals")
-def get_active_approvals(db: Session = Depends(get_db)):
+async def get_active_approvals(db: AsyncSession = Depends(get_async_db)):
     """
-    Get all currently valid/approved visitors.
-    For guard to see who can enter.
+    Get all currently valid/approved visitors, soonest-expiring first.
+    For guard to see who can enter. Served from the in-memory approval cache.
     """
     now = datetime.utcnow()
     
-    approvals = db.query(Approval).filter(
-        Approval.status == "approved",
-        Approval.valid_from <= now,
-        Approval.valid_until >= now
-    ).all()
-    
-    results = []
-    for approval in approvals:
-        visitor = db.query(Visitor).filter(Visitor.id == approval.visitor_id).first()
-        resident = db.query(Resident).filter(Resident.id == approval.resident_id).first()
-        
-        if visitor and resident:
-            results.append({
-                "approval_id": approval.id,
-                "visitor_id": visitor.id,
-                "visitor_name": visitor.name,
-                "purpose": visitor.purpose,
-                "photo_url": visitor.photo_url,
-                "apt_number": resident.apt_number,
-                "resident_name": resident.name,
-                "valid_from": approval.valid_from,
-                "valid_until": approval.valid_until,
-                "time_remaining_mins": int((approval.valid_until - now).total_seconds() / 60)
-            })
+    approvals = approval_cache.get_active(now)
+    if approvals is None:
+        approvals = await db.run_sync(lambda session: approval_cache.load_active(session, now))
+    
+    results = [
+        {
+            "approval_id": approval["approval_id"],
+            "visitor_id": approval["visitor_id"],
+            "visitor_name": approval["visitor_name"],
+            "purpose": approval["purpose"],
+            "photo_url": approval["photo_url"],
+            "apt_number": approval["apt_number"],
+            "resident_name": approval["resident_name"],
+            "valid_from": approval["valid_from"],
+            "valid_until": approval["valid_until"],
+            "time_remaining_mins": int((approval["valid_until"] - now).total_seconds() / 60)
+        }
+        for approval in approvals
+    ]
     
     return {
         "active_approvals": results,
@@ -53,23 +54,28 @@ def get_active_approvals(db: Session = Depends(get_db)):
 
 
 @router.get("/expected-today")
-def get_expected_today(db: Session = Depends(get_db)):
+async def get_expected_today(db: AsyncSession = Depends(get_async_db)):
     """
     Get all visitors expected today (pending + approved).
     """
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     today_end = today_start + timedelta(days=1)
     
-    approvals = db.query(Approval).filter(
-        Approval.status.in_(["pending", "approved"]),
-        Approval.created_at >= today_start,
-        Approval.created_at < today_end
-    ).all()
+    approvals = (await db.execute(
+        select(Approval).options(
+            joinedload(Approval.visitor),
+            joinedload(Approval.resident)
+        ).where(
+            Approval.status.in_(["pending", "approved"]),
+            Approval.created_at >= today_start,
+            Approval.created_at < today_end
+        )
+    )).scalars().all()
     
     results = []
     for approval in approvals:
-        visitor = db.query(Visitor).filter(Visitor.id == approval.visitor_id).first()
-        resident = db.query(Resident).filter(Resident.id == approval.resident_id).first()
+        visitor = approval.visitor
+        resident = approval.resident
         
         if visitor and resident:
             results.append({
@@ -100,15 +106,20 @@ def get_expected_today(db: Session = Depends(get_db)):
 
 
 @router.post("/check-in/{approval_id}")
-def check_in_visitor(
+async def check_in_visitor(
     approval_id: int,
     guard_id: int = 1,  # Default guard for demo
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Guard records visitor check-in.
     """
-    approval = db.query(Approval).filter(Approval.id == approval_id).first()
+    approval = (await db.execute(
+        select(Approval).options(
+            joinedload(Approval.visitor),
+            joinedload(Approval.resident)
+        ).where(Approval.id == approval_id)
+    )).scalars().first()
     if not approval:
         raise HTTPException(status_code=404, detail="Approval not found")
     
@@ -129,9 +140,10 @@ def check_in_visitor(
                guard_id=guard_id,
                details=f"Visitor checked in at {now}")
     
-    db.commit()
+    await db.commit()
     
-    visitor = db.query(Visitor).filter(Visitor.id == approval.visitor_id).first()
+    visitor = approval.visitor
+    notification_service.publish_approval("checked_in", approval, visitor, approval.resident)
     
     return {
         "message": "Visitor checked in successfully",
@@ -142,33 +154,28 @@ def check_in_visitor(
 
 
 @router.get("/search")
-def search_visitor(
+async def search_visitor(
     query: str,
-    db: Session = Depends(get_db)
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Guard searches for a visitor by name or phone.
+    Substring match via the visitor search index, best matches first.
     """
-    visitors = db.query(Visitor).filter(
-        (Visitor.name.ilike(f"%{query}%")) |
-        (Visitor.phone.ilike(f"%{query}%"))
-    ).all()
+    matches = await db.run_sync(
+        lambda session: search_visitors_with_latest_approval(session, query, limit=limit)
+    )
     
-    if not visitors:
+    if not matches:
         return {"results": [], "count": 0, "message": "No visitors found"}
     
     now = datetime.utcnow()
     results = []
     
-    for visitor in visitors:
-        # Get latest approval
-        approval = db.query(Approval).filter(
-            Approval.visitor_id == visitor.id
-        ).order_by(Approval.created_at.desc()).first()
-        
+    for visitor, approval, resident in matches:
         status_info = None
         if approval:
-            resident = db.query(Resident).filter(Resident.id == approval.resident_id).first()
             is_valid_now = (
                 approval.status == "approved" and
                 approval.valid_from and approval.valid_until and
@@ -4,12 +4,14 @@ Recurring Visitor Management API Endpoints
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from database import get_db
 from models import RecurringVisitor, Visitor, Approval, Resident
 from schemas import RecurringVisitorCreate, RecurringVisitorResponse
 from services.time_validator import parse_time_string
+from services.approval_cache import approval_cache
+from services.notification_service import notification_service
 from utils.audit_logger import log_action
 
 router = APIRouter(prefix="/api/recurring-visitors", tags=["recurring"])
@@ -220,12 +222,16 @@ def generate_today_approvals(
     """
     today = datetime.utcnow().weekday()
     
-    query = db.query(RecurringVisitor).filter(RecurringVisitor.is_active == True)
+    query = db.query(RecurringVisitor).options(
+        joinedload(RecurringVisitor.resident)
+    ).filter(RecurringVisitor.is_active == True)
     if resident_id:
         query = query.filter(RecurringVisitor.resident_id == resident_id)
     
     recurring_visitors = query.all()
     approvals_created = 0
+    created = []
+    db.expire_on_commit = False  # Events are published from these rows after commit; skip the refresh SELECTs
     
     for rv in recurring_visitors:
         schedule_days = parse_schedule(rv.schedule)
@@ -265,6 +271,7 @@ def generate_today_approvals(
             approved_at=datetime.utcnow()
         )
         db.add(approval)
+        created.append((approval, visitor, rv))
         
         log_action(
             db, "recurring_auto",
@@ -276,6 +283,9 @@ def generate_today_approvals(
         approvals_created += 1
     
     db.commit()
+    approval_cache.invalidate()
+    for approval, visitor, rv in created:
+        notification_service.publish_approval("approved", approval, visitor, rv.resident)
     
     return {
         "message": f"Generated {approvals_created} approvals for today",
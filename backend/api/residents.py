@@ -5,26 +5,27 @@ GET /api/residents/{id}/pending-approvals
 """
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, select
 
-from database import get_db
-from models import Resident, Approval, Visitor
+from database import get_db, get_async_db
+from models import Resident, Approval
 from schemas import TodayScheduleResponse, ScheduleVisitor, ResidentResponse
 
 router = APIRouter(prefix="/api/residents", tags=["residents"])
 
 
 @router.get("/{resident_id}/schedule-today", response_model=TodayScheduleResponse)
-def get_schedule_today(
+async def get_schedule_today(
     resident_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get today's visitor schedule for a resident.
     Shows all approvals created or valid for today.
     """
-    resident = db.query(Resident).filter(Resident.id == resident_id).first()
+    resident = await db.get(Resident, resident_id)
     if not resident:
         raise HTTPException(status_code=404, detail="Resident not found")
     
@@ -33,19 +34,21 @@ def get_schedule_today(
     today_end = today_start + timedelta(days=1)
     
     # Get all approvals for today (created today or valid today)
-    approvals = db.query(Approval).filter(
-        Approval.resident_id == resident_id,
-        # Either created today OR valid window includes today
-        ((Approval.created_at >= today_start) & (Approval.created_at < today_end)) |
-        ((Approval.valid_from != None) & (Approval.valid_from < today_end) & (Approval.valid_until >= today_start))
-    ).order_by(Approval.created_at.desc()).all()
+    approvals = (await db.execute(
+        select(Approval).options(joinedload(Approval.visitor)).where(
+            Approval.resident_id == resident_id,
+            # Either created today OR valid window includes today
+            ((Approval.created_at >= today_start) & (Approval.created_at < today_end)) |
+            ((Approval.valid_from != None) & (Approval.valid_from < today_end) & (Approval.valid_until >= today_start))
+        ).order_by(Approval.created_at.desc())
+    )).scalars().all()
     
     visitors = []
     pending_count = 0
     approved_count = 0
     
     for approval in approvals:
-        visitor = db.query(Visitor).filter(Visitor.id == approval.visitor_id).first()
+        visitor = approval.visitor
         if visitor:
             visitors.append(ScheduleVisitor(
                 approval_id=approval.id,
@@ -77,26 +80,28 @@ def get_schedule_today(
 
 
 @router.get("/{resident_id}/pending-approvals")
-def get_pending_approvals(
+async def get_pending_approvals(
     resident_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all pending approval requests for a resident.
     Used for the approval notification screen.
     """
-    resident = db.query(Resident).filter(Resident.id == resident_id).first()
+    resident = await db.get(Resident, resident_id)
     if not resident:
         raise HTTPException(status_code=404, detail="Resident not found")
     
-    approvals = db.query(Approval).filter(
-        Approval.resident_id == resident_id,
-        Approval.status == "pending"
-    ).order_by(Approval.created_at.desc()).all()
+    approvals = (await db.execute(
+        select(Approval).options(joinedload(Approval.visitor)).where(
+            Approval.resident_id == resident_id,
+            Approval.status == "pending"
+        ).order_by(Approval.created_at.desc())
+    )).scalars().all()
     
     results = []
     for approval in approvals:
-        visitor = db.query(Visitor).filter(Visitor.id == approval.visitor_id).first()
+        visitor = approval.visitor
         if visitor:
             results.append({
                 "approval_id": approval.id,
@@ -8,19 +8,25 @@ GET  /api/visitors/check-status/{visitor_id}
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
-from database import get_db
+from database import get_db, get_async_db
 from models import Visitor, Approval, Resident, AuditLog
 from schemas import (
     ApprovalRequestCreate, ApprovalAction, ApprovalDeny,
     ApprovalResponse, ApprovalStatusResponse, VisitorResponse
 )
+from services.approval_cache import approval_cache, MISS
+from services.notification_service import notification_service
+from services.visitor_lookup import search_visitors_with_latest_approval
+from services.visitor_search import DEFAULT_SEARCH_LIMIT
 from core import settings
 
 DEFAULT_APPROVAL_DURATION = settings.default_approval_duration
 from utils.audit_logger import log_action
+from utils.phone import normalize_phone
 
 router = APIRouter(prefix="/api/visitors", tags=["visitors"])
 
@@ -39,16 +45,24 @@ def request_approval(
     if not resident:
         raise HTTPException(status_code=404, detail=f"No resident found for apartment {request.apt_number}")
     
-    # Create or find visitor
-    visitor = db.query(Visitor).filter(
-        Visitor.name == request.visitor_name,
-        Visitor.phone == request.visitor_phone
-    ).first()
+    # Create or find visitor (matched on normalized phone, so "+971 50..." == "050...")
+    phone_e164 = normalize_phone(request.visitor_phone)
+    if phone_e164:
+        visitor = db.query(Visitor).filter(
+            Visitor.phone_e164 == phone_e164,
+            Visitor.name == request.visitor_name
+        ).first()
+    else:
+        visitor = db.query(Visitor).filter(
+            Visitor.name == request.visitor_name,
+            Visitor.phone == request.visitor_phone
+        ).first()
     
     if not visitor:
         visitor = Visitor(
             name=request.visitor_name,
             phone=request.visitor_phone,
+            phone_e164=phone_e164,
             purpose=request.purpose,
             photo_url=request.photo_url
         )
@@ -72,7 +86,9 @@ def request_approval(
                details=f"Visitor {visitor.name} requesting access to apt {request.apt_number}")
     
     db.commit()
+    approval_cache.invalidate()
     db.refresh(approval)
+    notification_service.publish_approval("approval_requested", approval, visitor, resident)
     
     # Build response
     return ApprovalResponse(
@@ -130,9 +146,11 @@ def approve_visitor(
                details=f"Valid until {approval.valid_until}")
     
     db.commit()
+    approval_cache.invalidate()
     db.refresh(approval)
     
     visitor = db.query(Visitor).filter(Visitor.id == approval.visitor_id).first()
+    notification_service.publish_approval("approved", approval, visitor, approval.resident)
     
     return ApprovalResponse(
         id=approval.id,
@@ -181,79 +199,74 @@ def deny_visitor(
                details=f"Reason: {action.reason or 'No reason provided'}")
     
     db.commit()
+    approval_cache.invalidate()
+    notification_service.publish_approval("denied", approval, approval.visitor, approval.resident)
     
     return {"message": "Visitor denied", "approval_id": approval.id}
 
 
 @router.get("/check-status/{visitor_id}", response_model=ApprovalStatusResponse)
-def check_visitor_status(
+async def check_visitor_status(
     visitor_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Guard checks if a visitor is currently authorized.
-    Returns the most recent approval for this visitor.
+    Returns the most recent approval for this visitor (cached in memory between writes).
     """
     # Get the most recent approval for this visitor
-    approval = db.query(Approval).filter(
-        Approval.visitor_id == visitor_id
-    ).order_by(Approval.created_at.desc()).first()
+    approval = approval_cache.get_latest(visitor_id)
+    if approval is MISS:
+        approval = await db.run_sync(
+            lambda session: approval_cache.load_latest(session, visitor_id)
+        )
     
     if not approval:
         raise HTTPException(status_code=404, detail="No approval found for this visitor")
     
-    visitor = db.query(Visitor).filter(Visitor.id == visitor_id).first()
-    resident = db.query(Resident).filter(Resident.id == approval.resident_id).first()
-    
     # Check if currently valid
     now = datetime.utcnow()
     is_valid_now = (
-        approval.status == "approved" and
-        approval.valid_from is not None and
-        approval.valid_until is not None and
-        approval.valid_from <= now <= approval.valid_until
+        approval["status"] == "approved" and
+        approval["valid_from"] is not None and
+        approval["valid_until"] is not None and
+        approval["valid_from"] <= now <= approval["valid_until"]
     )
     
     return ApprovalStatusResponse(
-        approval_id=approval.id,
-        status=approval.status,
-        visitor_name=visitor.name if visitor else "Unknown",
-        purpose=visitor.purpose if visitor else None,
-        photo_url=visitor.photo_url if visitor else None,
-        valid_from=approval.valid_from,
-        valid_until=approval.valid_until,
+        approval_id=approval["approval_id"],
+        status=approval["status"],
+        visitor_name=approval["visitor_name"] or "Unknown",
+        purpose=approval["purpose"],
+        photo_url=approval["photo_url"],
+        valid_from=approval["valid_from"],
+        valid_until=approval["valid_until"],
         is_valid_now=is_valid_now,
-        apt_number=resident.apt_number if resident else "Unknown",
-        resident_name=resident.name if resident else "Unknown"
+        apt_number=approval["apt_number"] or "Unknown",
+        resident_name=approval["resident_name"] or "Unknown"
     )
 
 
 @router.get("/check-by-name")
 def check_by_name(
     name: str,
+    limit: int = DEFAULT_SEARCH_LIMIT,
     db: Session = Depends(get_db)
 ):
     """
     Guard searches for a visitor by name.
     Returns matching visitors with their current status.
     """
-    visitors = db.query(Visitor).filter(
-        Visitor.name.ilike(f"%{name}%")
-    ).all()
+    matches = search_visitors_with_latest_approval(db, name, fields=("name",), limit=limit)
     
-    if not visitors:
+    if not matches:
         raise HTTPException(status_code=404, detail="No visitors found with that name")
     
     results = []
     now = datetime.utcnow()
     
-    for visitor in visitors:
-        approval = db.query(Approval).filter(
-            Approval.visitor_id == visitor.id
-        ).order_by(Approval.created_at.desc()).first()
-        
+    for visitor, approval, resident in matches:
         if approval:
-            resident = db.query(Resident).filter(Resident.id == approval.resident_id).first()
             is_valid_now = (
                 approval.status == "approved" and
                 approval.valid_from is not None and
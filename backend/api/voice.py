@@ -2,17 +2,27 @@
 Voice Processing API Endpoints
 POST /api/voice/process - Full voice to approval pipeline
 POST /api/voice/transcribe - Just transcribe audio
+WS   /api/voice/stream - Streamed audio with partial transcripts
+GET /api/voice/health - Whisper worker status
 """
+import json
+import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db
+from database import get_db, SessionLocal
 from models import Visitor, Approval, Resident
 from schemas import VoiceProcessResponse
-from services.voice_processor import process_voice_command, save_audio_temp, cleanup_audio, transcribe_audio
+from services.voice_processor import process_voice_command, transcribe_audio
 from services.time_validator import parse_time_string, calculate_time_window
+from services.approval_cache import approval_cache
+from services.notification_service import notification_service
+from services.voice_stream import VoiceStream
+from services.whisper_worker import whisper_worker
 from utils.audit_logger import log_action
 from core import settings
 
@@ -21,6 +31,112 @@ DEFAULT_APPROVAL_DURATION = settings.default_approval_duration
 router = APIRouter(prefix="/api/voice", tags=["voice"])
 
 
+def _extension(audio: UploadFile) -> str:
+    """Upload file extension (only used to name debug audio files)"""
+    suffix = Path(audio.filename or "").suffix.lower()
+    return suffix if suffix.isascii() and suffix[1:].isalnum() else ".wav"
+
+
+def _voice_response(db: Session, resident: Resident, result: dict, language: Optional[str]) -> VoiceProcessResponse:
+    """Create the auto-approved visitor approval for a processed voice command"""
+    if not result["success"]:
+        return VoiceProcessResponse(
+            success=False,
+            transcript="",
+            language=language or "en",
+            extracted={},
+            approval_id=None,
+            message=f"Transcription failed: {result['error']}"
+        )
+    
+    extracted = result["extracted"]
+    
+    # Create visitor and approval if we extracted useful info
+    approval_id = None
+    message = ""
+    
+    if extracted.get("visitor_name") or extracted.get("purpose"):
+        # Create or find visitor
+        visitor_name = extracted.get("visitor_name") or "Voice Visitor"
+        
+        visitor = Visitor(
+            name=visitor_name,
+            purpose=extracted.get("purpose"),
+        )
+        db.add(visitor)
+        db.flush()
+        
+        # Calculate time window
+        scheduled_time = None
+        if extracted.get("time"):
+            scheduled_time = parse_time_string(extracted["time"])
+        
+        if scheduled_time is None:
+            scheduled_time = datetime.utcnow()
+        
+        valid_from, valid_until = calculate_time_window(
+            scheduled_time, 
+            DEFAULT_APPROVAL_DURATION
+        )
+        
+        # Create auto-approved approval
+        approval = Approval(
+            resident_id=resident.id,
+            visitor_id=visitor.id,
+            status="approved",
+            valid_from=valid_from,
+            valid_until=valid_until,
+            approval_method="voice",
+            approved_at=datetime.utcnow()
+        )
+        db.add(approval)
+        db.flush()
+        
+        approval_id = approval.id
+        
+        # Log the action
+        log_action(
+            db, "voice_command",
+            resident_id=resident.id,
+            visitor_id=visitor.id,
+            details=f"Voice approval: {visitor_name}, valid until {valid_until}"
+        )
+        
+        db.commit()
+        approval_cache.invalidate()
+        notification_service.publish_approval("approved", approval, visitor, resident)
+        message = f"Created approval for {visitor_name}, valid until {valid_until.strftime('%H:%M')}"
+    else:
+        message = "Could not extract visitor information. Please try again with clearer speech."
+    
+    return VoiceProcessResponse(
+        success=True,
+        transcript=result["transcript"],
+        language=result["language"],
+        extracted=extracted,
+        approval_id=approval_id,
+        message=message
+    )
+
+
+def _resident_exists(resident_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Resident.id).filter(Resident.id == resident_id).first() is not None
+    finally:
+        db.close()
+
+
+def _stream_voice_response(resident_id: int, result: dict, language: Optional[str]) -> VoiceProcessResponse:
+    """_voice_response with its own session, for the websocket (no request-scoped session)"""
+    db = SessionLocal()
+    try:
+        resident = db.query(Resident).filter(Resident.id == resident_id).first()
+        return _voice_response(db, resident, result, language)
+    finally:
+        db.close()
+
+
 @router.post("/process", response_model=VoiceProcessResponse)
 async def process_voice(
     audio: UploadFile = File(...),
@@ -37,99 +153,17 @@ async def process_voice(
     
     Supports Arabic and English.
     """
-    # Verify resident exists
-    resident = db.query(Resident).filter(Resident.id == resident_id).first()
+    # Verify resident exists (sync session: keep its queries off the event loop)
+    resident = await run_in_threadpool(lambda: db.query(Resident).filter(Resident.id == resident_id).first())
     if not resident:
         raise HTTPException(status_code=404, detail="Resident not found")
     
-    # Save audio to temp file
     audio_bytes = await audio.read()
-    audio_path = save_audio_temp(audio_bytes)
     
-    try:
-        # Process voice command
-        result = process_voice_command(audio_path, resident_id, language)
-        
-        if not result["success"]:
-            return VoiceProcessResponse(
-                success=False,
-                transcript="",
-                language=language or "en",
-                extracted={},
-                approval_id=None,
-                message=f"Transcription failed: {result['error']}"
-            )
-        
-        extracted = result["extracted"]
-        
-        # Create visitor and approval if we extracted useful info
-        approval_id = None
-        message = ""
-        
-        if extracted.get("visitor_name") or extracted.get("purpose"):
-            # Create or find visitor
-            visitor_name = extracted.get("visitor_name") or "Voice Visitor"
-            
-            visitor = Visitor(
-                name=visitor_name,
-                purpose=extracted.get("purpose"),
-            )
-            db.add(visitor)
-            db.flush()
-            
-            # Calculate time window
-            scheduled_time = None
-            if extracted.get("time"):
-                scheduled_time = parse_time_string(extracted["time"])
-            
-            if scheduled_time is None:
-                scheduled_time = datetime.utcnow()
-            
-            valid_from, valid_until = calculate_time_window(
-                scheduled_time, 
-                DEFAULT_APPROVAL_DURATION
-            )
-            
-            # Create auto-approved approval
-            approval = Approval(
-                resident_id=resident_id,
-                visitor_id=visitor.id,
-                status="approved",
-                valid_from=valid_from,
-                valid_until=valid_until,
-                approval_method="voice",
-                approved_at=datetime.utcnow()
-            )
-            db.add(approval)
-            db.flush()
-            
-            approval_id = approval.id
-            
-            # Log the action
-            log_action(
-                db, "voice_command",
-                resident_id=resident_id,
-                visitor_id=visitor.id,
-                details=f"Voice approval: {visitor_name}, valid until {valid_until}"
-            )
-            
-            db.commit()
-            message = f"Created approval for {visitor_name}, valid until {valid_until.strftime('%H:%M')}"
-        else:
-            message = "Could not extract visitor information. Please try again with clearer speech."
-        
-        return VoiceProcessResponse(
-            success=True,
-            transcript=result["transcript"],
-            language=result["language"],
-            extracted=extracted,
-            approval_id=approval_id,
-            message=message
-        )
-        
-    finally:
-        # Cleanup temp audio file
-        cleanup_audio(audio_path)
+    # Process voice command (decoded in memory, no temp file)
+    result = await process_voice_command(audio_bytes, resident_id, language, _extension(audio))
+    
+    return await run_in_threadpool(_voice_response, db, resident, result, language)
 
 
 @router.post("/transcribe")
@@ -142,19 +176,85 @@ async def transcribe_only(
     Useful for testing Whisper integration.
     """
     audio_bytes = await audio.read()
-    audio_path = save_audio_temp(audio_bytes)
+    result = await transcribe_audio(audio_bytes, language, _extension(audio))
+    return {
+        "success": result["success"],
+        "transcript": result["text"],
+        "language": result["language"],
+        "error": result.get("error"),
+        "is_mock": result.get("mock", False),
+        "cached": result.get("cached", False)
+    }
+
+
+@router.websocket("/stream")
+async def stream_voice(
+    websocket: WebSocket,
+    resident_id: int,
+    language: Optional[str] = None,
+    sample_rate: int = 16000
+):
+    """
+    Stream a voice command while it is being recorded.
+    
+    Client -> server:
+        binary frames: raw 16-bit little-endian mono PCM at `sample_rate`
+        {"type": "end"}: button released, finalize
+        {"type": "cancel"}: discard without creating an approval
+    Server -> client:
+        {"type": "ready", ...}
+        {"type": "partial", "transcript", "language", "extracted", "audio_seconds", "is_mock"}
+        {"type": "final", <VoiceProcessResponse fields>, "finalize_ms"}
+    """
+    # Blocking DB work runs in the threadpool, off the event loop serving other streams
+    resident_exists = await run_in_threadpool(_resident_exists, resident_id)
+    if not resident_exists or not 8000 <= sample_rate <= 48000:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    stream = VoiceStream(language, sample_rate, websocket.send_json)
+    await websocket.send_json({
+        "type": "ready",
+        "sample_rate": sample_rate,
+        "max_seconds": settings.voice_stream_max_seconds,
+    })
     
     try:
-        result = transcribe_audio(audio_path, language)
-        return {
-            "success": result["success"],
-            "transcript": result["text"],
-            "language": result["language"],
-            "error": result.get("error"),
-            "is_mock": result.get("mock", False)
-        }
-    finally:
-        cleanup_audio(audio_path)
+        while not stream.full:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                stream.cancel()
+                return
+            if message.get("bytes") is not None:
+                stream.feed(message["bytes"])
+                continue
+            try:
+                command = json.loads(message.get("text") or "{}")
+            except ValueError:
+                continue
+            if command.get("type") == "end":
+                break
+            if command.get("type") == "cancel":
+                stream.cancel()
+                await websocket.close()
+                return
+        
+        released = time.perf_counter()
+        result, reused = await stream.finish()
+        
+        response = await run_in_threadpool(_stream_voice_response, resident_id, result, language)
+        
+        await websocket.send_json({
+            "type": "final",
+            **response.model_dump(),
+            "is_mock": result.get("is_mock", False),
+            "from_partial": reused,
+            "finalize_ms": round((time.perf_counter() - released) * 1000),
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        stream.cancel()
 
 
 @router.post("/test-extraction")
@@ -171,3 +271,12 @@ async def test_extraction(text: str = Form(...), language: str = Form("en")):
         "language": language,
         "extracted": entities
     }
+
+
+@router.get("/health")
+async def voice_health():
+    """
+    Whisper worker status: model, state (loading / warming / ready / mock /
+    unavailable), warm-up time, queued jobs and restarts.
+    """
+    return whisper_worker.health()
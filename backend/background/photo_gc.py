@@ -0,0 +1,19 @@
+"""
+Remove stored photos that no record references
+Run periodically (see scheduler.py) or by hand: python -m background.photo_gc
+"""
+from core import settings
+from services.photo_manager import photo_manager
+
+
+def collect_unreferenced_photos(grace_hours: int = settings.photo_gc_grace_hours) -> int:
+    """Delete unreferenced photo blobs older than the grace period"""
+    return photo_manager.collect_unreferenced_photos(grace_hours)
+
+
+if __name__ == "__main__":
+    from database import init_db
+
+    init_db()
+    removed = collect_unreferenced_photos()
+    print(f"Removed {removed} unreferenced photo(s)")
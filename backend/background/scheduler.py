@@ -8,7 +8,14 @@ scheduler = BackgroundScheduler()
 
 def start_background_jobs():
     """Start all background jobs"""
+    from core import settings
+    from background.photo_gc import collect_unreferenced_photos
+
     if not scheduler.running:
+        add_job(
+            collect_unreferenced_photos, "interval",
+            hours=settings.photo_gc_interval_hours, id="photo_gc", replace_existing=True
+        )
         scheduler.start()
 
 
@@ -0,0 +1,207 @@
+"""
+Guard read latency under concurrent approval writes
+Writer processes create and approve visitor requests at a fixed rate (the
+request-approval + /approve transactions) while a reader process runs
+the two guard reads, active-approvals and check-status, against the same
+SQLite file. The approval cache is invalidated by every write, so under a
+steady stream of approvals these reads hit the database; the benchmark
+issues them uncached. Each journal configuration gets a fresh database and
+the same write load, and reports read p50/p99/max, reads that failed on a
+lock, and the write rate actually achieved.
+
+    python -m benchmarks.approval_contention
+    python -m benchmarks.approval_contention --writers 4 --rate 50 --seconds 10
+
+DELETE/FULL is SQLite's default (the pre-WAL configuration); WAL/NORMAL is
+what .env ships. Processes, not threads, so the GIL does not serialize the
+reader behind the writers. Commit cost is mostly fsync, so run it with
+--dir on the disk the database lives on; on tmpfs, or with fewer CPUs than
+processes, CPU sharing dominates and the configurations look alike.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+
+JOURNAL_CONFIGS = (("DELETE", "FULL"), ("WAL", "NORMAL"))
+
+
+def _use_database(path: str, journal_mode: str, synchronous: str):
+    """Point this process's settings at the benchmark database (before importing it)"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["SQLITE_JOURNAL_MODE"] = journal_mode
+    os.environ["SQLITE_SYNCHRONOUS"] = synchronous
+    os.environ["LOG_LEVEL"] = "WARNING"  # init_db and migrations log at INFO
+
+
+def _setup(path: str, journal_mode: str, synchronous: str, approvals: int):
+    _use_database(path, journal_mode, synchronous)
+    from datetime import datetime, timedelta
+
+    from database import SessionLocal, init_db, seed_demo_data
+    from models import Approval, Resident, Visitor
+
+    init_db()
+    seed_demo_data()
+    db = SessionLocal()
+    try:
+        resident = db.query(Resident).first()
+        now = datetime.utcnow()
+        for i in range(approvals):
+            visitor = Visitor(name=f"Contention Visitor {i}", purpose="Benchmark")
+            db.add(visitor)
+            db.flush()
+            db.add(Approval(
+                resident_id=resident.id,
+                visitor_id=visitor.id,
+                status="approved",
+                valid_from=now,
+                valid_until=now + timedelta(hours=2),
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _writer(path: str, journal_mode: str, synchronous: str, start_at: float, seconds: float, rate: float, results):
+    _use_database(path, journal_mode, synchronous)
+    from datetime import datetime, timedelta
+
+    from sqlalchemy.exc import OperationalError
+
+    from database import SessionLocal
+    from models import Approval, Resident, Visitor
+    from utils.audit_logger import log_action
+
+    db = SessionLocal()
+    resident_id = db.query(Resident).first().id
+    writes = errors = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    for i in itertools.count():
+        due = start_at + i / rate  # Paced, so every configuration gets the same load
+        if due >= start_at + seconds:
+            break
+        time.sleep(max(0.0, due - time.time()))
+        try:
+            visitor = Visitor(name="Contention Writer", purpose="Benchmark")
+            db.add(visitor)
+            db.flush()
+            approval = Approval(resident_id=resident_id, visitor_id=visitor.id, status="pending")
+            db.add(approval)
+            log_action(db, "approval_requested", resident_id=resident_id, visitor_id=visitor.id)
+            db.commit()
+
+            now = datetime.utcnow()
+            approval.status = "approved"
+            approval.approved_at = now
+            approval.valid_from = now
+            approval.valid_until = now + timedelta(minutes=90)
+            log_action(db, "approved", resident_id=resident_id, visitor_id=visitor.id)
+            db.commit()
+            writes += 2
+        except OperationalError:
+            db.rollback()
+            errors += 1
+    db.close()
+    results.put(("writer", writes, errors))
+
+
+def _reader(path: str, journal_mode: str, synchronous: str, start_at: float, seconds: float, results):
+    _use_database(path, journal_mode, synchronous)
+    from sqlalchemy.exc import OperationalError
+
+    from database import SessionLocal
+    from services.approval_cache import approval_cache
+
+    latencies = []
+    errors = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    visitor_id = 1
+    while time.time() < start_at + seconds:
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            approval_cache.invalidate()  # As after every approval write
+            approval_cache.load_active(db)
+            approval_cache.load_latest(db, visitor_id)
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+        finally:
+            db.close()
+        visitor_id = visitor_id % 50 + 1
+    results.put(("reader", latencies, errors))
+
+
+def run_config(journal_mode: str, synchronous: str, args) -> dict:
+    context = multiprocessing.get_context("spawn")  # Each process imports settings from its own env
+    path = os.path.join(tempfile.mkdtemp(prefix="vms-bench-", dir=args.dir), "bench.db")
+
+    setup = context.Process(target=_setup, args=(path, journal_mode, synchronous, args.approvals))
+    setup.start()
+    setup.join()
+
+    results = context.Queue()
+    start_at = time.time() + 3  # Let the spawned interpreters finish importing
+    processes = [
+        context.Process(target=_reader, args=(path, journal_mode, synchronous, start_at, args.seconds, results))
+    ] + [
+        context.Process(
+            target=_writer,
+            args=(path, journal_mode, synchronous, start_at, args.seconds, args.rate, results),
+        )
+        for _ in range(args.writers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        outcomes = [results.get(timeout=args.seconds + 60) for _ in processes]
+    except queue.Empty:
+        raise SystemExit("A benchmark process exited without reporting (see its traceback above)")
+    for process in processes:
+        process.join()
+
+    latencies, read_errors = next((o[1], o[2]) for o in outcomes if o[0] == "reader")
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else float("nan"),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else float("nan"),
+        "max_ms": latencies[-1] * 1000 if latencies else float("nan"),
+        "read_errors": read_errors,
+        "writes_per_sec": sum(o[1] for o in outcomes if o[0] == "writer") / args.seconds,
+        "write_errors": sum(o[2] for o in outcomes if o[0] == "writer"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=2, help="Concurrent approval writer processes")
+    parser.add_argument("--rate", type=float, default=25.0, help="Approvals per second per writer")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measured run length per configuration")
+    parser.add_argument("--dir", help="Directory for the scratch databases (default: system temp dir)")
+    parser.add_argument("--approvals", type=int, default=50, help="Active approvals seeded before the run")
+    args = parser.parse_args()
+
+    print(
+        f"{args.writers} writer process(es) at {args.rate:g} approvals/s each, "
+        f"{args.seconds:g} s per configuration, {os.cpu_count()} CPU(s)"
+    )
+    print(
+        f"{'journal':<14}{'reads':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        f"{'read err':>10}{'writes/s':>10}{'write err':>11}"
+    )
+    for journal_mode, synchronous in JOURNAL_CONFIGS:
+        result = run_config(journal_mode, synchronous, args)
+        print(
+            f"{journal_mode + '/' + synchronous:<14}{result['reads']:>8}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}{result['read_errors']:>10}"
+            f"{result['writes_per_sec']:>10.1f}{result['write_errors']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
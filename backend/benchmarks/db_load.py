@@ -0,0 +1,137 @@
+"""
+Sync vs async database path under load
+Serves the expected-today query two ways, a `def` endpoint on SessionLocal
+(threadpool) and an `async def` endpoint on AsyncSession (event loop), and
+reports requests/sec and p50/p99 latency for each at several concurrency
+levels. Requests go through the ASGI app in-process, so the numbers cover
+FastAPI + SQLAlchemy + the driver, not the network.
+
+    python -m benchmarks.db_load
+    DATABASE_URL=sqlite:///data/database.db python -m benchmarks.db_load --requests 2000
+
+Without DATABASE_URL a scratch SQLite file is seeded with --approvals rows.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='vms-bench-')}/bench.db"
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
+from database import SessionLocal, async_engine, engine, get_async_db, get_db, init_db, seed_demo_data
+from models import Approval, Resident, Visitor
+
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+
+def _expected_today():
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return select(Approval).options(
+        joinedload(Approval.visitor),
+        joinedload(Approval.resident)
+    ).where(
+        Approval.status.in_(["pending", "approved"]),
+        Approval.created_at >= today_start,
+        Approval.created_at < today_start + timedelta(days=1)
+    )
+
+
+app = FastAPI()
+
+
+@app.get("/sync")
+def sync_expected_today(db: Session = Depends(get_db)):
+    return {"count": len(db.execute(_expected_today()).scalars().all())}
+
+
+@app.get("/async")
+async def async_expected_today(db: AsyncSession = Depends(get_async_db)):
+    return {"count": len((await db.execute(_expected_today())).scalars().all())}
+
+
+def seed_approvals(count: int):
+    """Top up today's approvals to `count`"""
+    db = SessionLocal()
+    try:
+        resident = db.query(Resident).first()
+        existing = db.execute(_expected_today()).scalars().all()
+        now = datetime.utcnow()
+        for i in range(count - len(existing)):
+            visitor = Visitor(name=f"Load Visitor {i}", purpose="Benchmark")
+            db.add(visitor)
+            db.flush()
+            db.add(Approval(
+                resident_id=resident.id,
+                visitor_id=visitor.id,
+                status="approved" if i % 2 else "pending",
+                valid_from=now,
+                valid_until=now + timedelta(hours=2),
+                created_at=now,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_load(client: httpx.AsyncClient, path: str, concurrency: int, total: int) -> dict:
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+async def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # One INFO line per request otherwise
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/sync", "/async"):
+            await run_load(client, path, 4, 50)  # Warm up pools and caches
+
+        print(f"{engine.url.drivername} / {async_engine.url.drivername}, {args.requests} requests per run")
+        print(f"{'path':<8}{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for concurrency in CONCURRENCY_LEVELS:
+            for path in ("/sync", "/async"):
+                result = await run_load(client, path, concurrency, args.requests)
+                print(
+                    f"{path:<8}{concurrency:>12}{result['rps']:>10.1f}"
+                    f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                )
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per path and concurrency level")
+    parser.add_argument("--approvals", type=int, default=50, help="Approvals expected today in a seeded database")
+    args = parser.parse_args()
+
+    init_db()
+    seed_demo_data()
+    seed_approvals(args.approvals)
+    asyncio.run(main(args))
@@ -0,0 +1,101 @@
+"""
+Decode-once vs per-step decode on a 1080p frame
+Times the compute behind /api/face/detect (detections + annotated JPEG) and
+/api/face/capture (detections + crop + stored descriptor) two ways: every
+step starting again from the uploaded bytes, as the endpoints did before
+FaceImage, and one FaceImage shared by all steps, as they do now. Also
+reports what one decode and one detection cost on their own.
+
+    python -m benchmarks.face_decode
+    python -m benchmarks.face_decode --image frame.jpg --repeat 50
+
+Without --image the frame is a synthetic 1920x1080 JPEG with a drawn face.
+"""
+import argparse
+import time
+
+import cv2
+
+from benchmarks import synthetic_faces
+from services.face_service import FaceImage, crop_face, detect_and_annotate, detect_faces, encode_jpeg
+
+
+def _detect_per_step(image_bytes: bytes):
+    detect_faces(image_bytes)
+    encode_jpeg(FaceImage.decode(image_bytes).annotated())
+
+
+def _detect_once(image_bytes: bytes):
+    detect_and_annotate(image_bytes)
+
+
+def _capture_per_step(image_bytes: bytes):
+    detect_faces(image_bytes)
+    crop_face(image_bytes)
+    FaceImage.decode(image_bytes).descriptor()
+
+
+def _capture_once(image_bytes: bytes):
+    face_image = FaceImage.decode(image_bytes)
+    face_image.detection_result()
+    encode_jpeg(face_image.crop_largest())
+    face_image.descriptor()
+
+
+def _decode(image_bytes: bytes):
+    FaceImage.decode(image_bytes)
+
+
+def _detect(decoded: FaceImage):
+    FaceImage(decoded.image).faces  # Fresh object, so gray + cascade run again
+
+
+def milliseconds(fn, *args, repeat: int) -> float:
+    """Median wall time of `fn(*args)` over `repeat` runs"""
+    fn(*args)  # Warm up the cascade and allocator
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", help="Frame to use (JPEG/PNG); default is a synthetic 1080p frame")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed runs per measurement")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+    else:
+        image, _ = synthetic_faces.frame(1920, 1080, [360])
+        image_bytes = synthetic_faces.jpeg(image)
+
+    decoded = FaceImage.decode(image_bytes)
+    if decoded is None:
+        raise SystemExit("Could not decode the benchmark image")
+    if not decoded.faces:
+        raise SystemExit("No face detected in the benchmark image")
+
+    print(
+        f"{decoded.width}x{decoded.height}, {len(image_bytes) / 1024:.0f} KiB JPEG, "
+        f"cv2 threads: {cv2.getNumThreads()}, median of {args.repeat}"
+    )
+    print(f"decode:    {milliseconds(_decode, image_bytes, repeat=args.repeat):8.2f} ms")
+    print(f"detect:    {milliseconds(_detect, decoded, repeat=args.repeat):8.2f} ms")
+    print(f"{'endpoint':<10}{'per step ms':>13}{'once ms':>10}{'saved':>8}")
+    for name, per_step, once in (
+        ("detect", _detect_per_step, _detect_once),
+        ("capture", _capture_per_step, _capture_once),
+    ):
+        before = milliseconds(per_step, image_bytes, repeat=args.repeat)
+        after = milliseconds(once, image_bytes, repeat=args.repeat)
+        print(f"{name:<10}{before:>13.2f}{after:>10.2f}{1 - after / before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Face detection downscale sweep
+Runs the cascade with FACE_DETECT_MAX_DIMENSION set to each cap in turn on
+720p, 1080p, 4K and 12 MP (phone photo) frames and reports, per resolution
+and cap, the median detection time, the share of faces found (recall) and
+detections that are not a face. "full" is detection at full resolution.
+
+    python -m benchmarks.face_detect_scale
+    python -m benchmarks.face_detect_scale --images gate1.jpg gate2.jpg
+
+Synthetic frames carry drawn faces of known size and position (64-324 px
+wide, the range a gate camera sees). With --images there is no ground
+truth, so "found" is agreement with the full-resolution detections.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import synthetic_faces
+from services.face_service import FaceImage
+
+CAPS = (0, 480, 640, 800, 960, 1280, 1600)
+RESOLUTIONS = ((1280, 720), (1920, 1080), (3840, 2160), (4032, 3024))
+FACE_WIDTHS = [64, 96, 144, 216, 324]
+
+
+def _matches(detection: tuple, face: tuple) -> bool:
+    """Detection centred inside the face box and of a comparable size"""
+    x, y, w, h = detection
+    fx, fy, fw, fh = face
+    cx, cy = x + w / 2, y + h / 2
+    return fx <= cx <= fx + fw and fy <= cy <= fy + fh and 0.5 * fw <= w <= 2 * fw
+
+
+def detect_timed(image: np.ndarray, cap: int) -> tuple:
+    """(detections, seconds) on a fresh FaceImage, so the gray frame is computed too"""
+    start = time.perf_counter()
+    faces = FaceImage(image)._detect(cap)
+    return faces, time.perf_counter() - start
+
+
+def sweep(frames: list, repeat: int) -> list:
+    """
+    frames: (image, face boxes or None). Returns one row per cap with the
+    median time, faces found / expected, and unmatched detections.
+    """
+    reference = [boxes if boxes is not None else detect_timed(image, 0)[0] for image, boxes in frames]
+    rows = []
+    for cap in CAPS:
+        times, found, expected, spurious = [], 0, 0, 0
+        for (image, _), faces in zip(frames, reference):
+            detect_timed(image, cap)  # Warm up
+            for _ in range(repeat):
+                detections, seconds = detect_timed(image, cap)
+                times.append(seconds)
+            found += sum(any(_matches(d, face) for d in detections) for face in faces)
+            expected += len(faces)
+            spurious += sum(not any(_matches(d, face) for face in faces) for d in detections)
+        times.sort()
+        rows.append((cap, times[len(times) // 2] * 1000, found, expected, spurious))
+    return rows
+
+
+def _print(title: str, rows: list):
+    print(title)
+    print(f"  {'cap':>6}{'median ms':>11}{'found':>10}{'recall':>8}{'spurious':>10}")
+    for cap, ms, found, expected, spurious in rows:
+        recall = found / expected if expected else float("nan")
+        print(f"  {cap or 'full':>6}{ms:>11.2f}{f'{found}/{expected}':>10}{recall:>8.0%}{spurious:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", nargs="+", help="Real frames to sweep instead of synthetic ones")
+    parser.add_argument("--frames", type=int, default=4, help="Synthetic frames per resolution")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed detections per frame and cap")
+    args = parser.parse_args()
+
+    if args.images:
+        frames = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                face_image = FaceImage.decode(f.read())
+            if face_image is None:
+                raise SystemExit(f"Could not decode {path}")
+            frames.append((face_image.image, None))
+        _print(f"{len(frames)} image(s), found = agreement with full-resolution detection", sweep(frames, args.repeat))
+        return
+
+    for width, height in RESOLUTIONS:
+        frames = [synthetic_faces.frame(width, height, FACE_WIDTHS, seed) for seed in range(args.frames)]
+        _print(f"{width}x{height}, {args.frames} frames x faces {FACE_WIDTHS} px", sweep(frames, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Face verification throughput
+Verifications/sec of the live-capture path behind /api/face/verify-identity
+(decode, detect, descriptor, match against a stored descriptor) at 1, 4 and
+8 threads, plus the cost of one 1:N match over the stored descriptors.
+
+    python -m benchmarks.face_verify --image face.jpg
+    python -m benchmarks.face_verify            # synthetic image, fixed face box
+
+Without --image the Haar cascade is replaced by a fixed face box, so the
+numbers cover everything but detection.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from services import face_service
+from services.face_descriptors import _from_blob, _to_blob
+from services.face_service import FaceImage, descriptor_sums, match_confidences
+
+THREAD_COUNTS = (1, 4, 8)
+
+
+class _FixedBoxCascade:
+    def detectMultiScale(self, *args, **kwargs):
+        return np.array([[160, 120, 240, 240]])
+
+
+def _synthetic_photo() -> bytes:
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:480, 0:640]
+    image = np.stack([x * 0.3 + 40, y * 0.4 + 60, (x + y) * 0.15 + 30], axis=-1)
+    image = np.clip(image + rng.normal(0, 12, image.shape), 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def _verify(image_bytes: bytes, reference: np.ndarray) -> float:
+    face_image = FaceImage.decode(image_bytes)
+    probe = face_image.descriptor()
+    if probe is None:
+        raise SystemExit("No face detected in the benchmark image")
+    return float(match_confidences(probe, reference[np.newaxis])[0])
+
+
+def verifications_per_second(image_bytes: bytes, reference: np.ndarray, threads: int, total: int) -> float:
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: _verify(image_bytes, reference), range(threads)))  # Warm up thread-local cascades
+        start = time.perf_counter()
+        list(pool.map(lambda _: _verify(image_bytes, reference), range(total)))
+        return total / (time.perf_counter() - start)
+
+
+def match_milliseconds(reference: np.ndarray, count: int, repeat: int = 20) -> float:
+    references = np.repeat(reference[np.newaxis], count, axis=0)
+    sums = descriptor_sums(references)  # Precomputed once per candidate set, as in face_identify
+    start = time.perf_counter()
+    for _ in range(repeat):
+        match_confidences(reference, references, sums)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", help="Face photo (JPEG/PNG); default is a synthetic image with a fixed face box")
+    parser.add_argument("--verifications", type=int, default=400, help="Verifications per thread count")
+    parser.add_argument("--references", type=int, default=5000, help="Stored descriptors for the 1:N match")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = _synthetic_photo()
+        face_service.get_face_cascade = lambda: _FixedBoxCascade()
+
+    reference = FaceImage.decode(image_bytes).descriptor()
+    if reference is None:
+        raise SystemExit("No face detected in the benchmark image")
+    reference = _from_blob(_to_blob(reference))  # As read back from the store
+
+    print(f"cv2 threads: {cv2.getNumThreads()}")
+    for threads in THREAD_COUNTS:
+        rate = verifications_per_second(image_bytes, reference, threads, args.verifications)
+        print(f"{threads} thread(s): {rate:8.1f} verifications/sec")
+    print(f"1:{args.references} match: {match_milliseconds(reference, args.references):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Synthetic camera frames for the face benchmarks
+Drawn frontal faces (skin ellipse, hair, brows, eyes, nose, mouth) that the
+frontal-face Haar cascade detects from about 40 px wide, on a noisy
+background, with the box each face was drawn in. Good enough to time the
+pipeline and to compare detection settings against known faces; use real
+photos (--image / --images) for absolute accuracy.
+"""
+import cv2
+import numpy as np
+
+SKIN = (150, 180, 215)
+HAIR = (30, 30, 40)
+
+
+def draw_face(image: np.ndarray, x: int, y: int, width: int) -> tuple:
+    """Draw a face of `width` px with its top-left at (x, y); returns its (x, y, w, h) box"""
+    s = width
+    height = int(s * 1.3)
+    cx, cy = x + s // 2, y + height // 2
+    line = max(1, int(s * 0.04))
+    cv2.ellipse(image, (cx, cy), (int(s * 0.5), int(s * 0.65)), 0, 0, 360, SKIN, -1)
+    cv2.ellipse(image, (cx, cy - int(s * 0.45)), (int(s * 0.52), int(s * 0.28)), 0, 180, 360, HAIR, -1)
+    for side in (-1, 1):
+        cv2.line(
+            image, (cx + side * int(s * 0.32), cy - int(s * 0.2)),
+            (cx + side * int(s * 0.1), cy - int(s * 0.22)), (40, 40, 50), line,
+        )
+        cv2.ellipse(image, (cx + side * int(s * 0.2), cy - int(s * 0.08)), (int(s * 0.1), int(s * 0.05)), 0, 0, 360, (240, 240, 240), -1)
+        cv2.circle(image, (cx + side * int(s * 0.2), cy - int(s * 0.08)), max(1, int(s * 0.045)), (30, 20, 20), -1)
+    cv2.line(image, (cx, cy - int(s * 0.05)), (cx - int(s * 0.04), cy + int(s * 0.15)), (110, 140, 180), line)
+    cv2.ellipse(image, (cx, cy + int(s * 0.3)), (int(s * 0.18), int(s * 0.06)), 0, 0, 360, (80, 80, 170), -1)
+    return x, y, s, height
+
+
+def background(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """Gradient with sensor-like noise, so the cascade has texture to reject"""
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([x / width * 60 + 60, y / height * 50 + 70, (x + y) / (width + height) * 40 + 80], axis=-1)
+    return np.clip(image + rng.normal(0, 8, image.shape), 0, 255).astype(np.uint8)
+
+
+def frame(width: int, height: int, face_widths: list, seed: int = 0) -> tuple:
+    """
+    A frame with one face per entry of `face_widths`, placed left to right
+    at random heights. Returns (BGR image, face boxes).
+    """
+    rng = np.random.default_rng(seed)
+    image = background(width, height, rng)
+    gap = (width - sum(face_widths)) // (len(face_widths) + 1)
+    if gap < 0:
+        raise ValueError("Faces do not fit side by side in the frame")
+
+    boxes = []
+    x = gap
+    for face_width in face_widths:
+        face_height = int(face_width * 1.3)
+        y = int(rng.integers(0, max(1, height - face_height)))
+        boxes.append(draw_face(image, x, y, face_width))
+        x += face_width + gap
+    return cv2.GaussianBlur(image, (3, 3), 0), boxes
+
+
+def jpeg(image: np.ndarray, quality: int = 90) -> bytes:
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
@@ -0,0 +1,120 @@
+"""
+Whisper micro-batch window: throughput vs latency
+Starts the transcription worker once per WHISPER_BATCH_WINDOW_MS value and
+submits clips at several arrival rates (Poisson, open loop, so slow batches
+build a queue like real traffic would). Reports jobs/sec completed, submit
+to result latency p50/p99, and the share of jobs that were decoded in a
+batch. Window 0 still batches jobs already queued, it just never waits.
+
+    python -m benchmarks.whisper_batching
+    python -m benchmarks.whisper_batching --audio command.wav --rates 0.5 1 2 --jobs 40
+
+Needs openai-whisper (the worker falls back to mock mode without it) and
+uses WHISPER_MODEL. Without --audio each clip is 4 s of a synthetic voiced
+tone; decode cost depends on the clip, so use a real voice command to set
+the default window.
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from core import metrics, settings
+from services.audio_decoder import SAMPLE_RATE, decode_audio
+from services.whisper_worker import FAILED, MOCK, READY, WhisperWorker
+
+WINDOWS_MS = (0, 10, 30, 60, 120)
+RATES = (1.0, 4.0, 8.0)  # Clips submitted per second
+
+
+def _synthetic_clip(seconds: float = 4.0) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)  # Gliding voiced fundamental with harmonics
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2  # Syllable-rate amplitude
+    return (0.1 * voiced * envelope).astype(np.float32)
+
+
+def _start(window_ms: int, max_size: int) -> WhisperWorker:
+    settings.use_mock_whisper = False
+    settings.whisper_batch_window_ms = window_ms  # Read when the worker process is spawned
+    settings.whisper_batch_max_size = max_size
+    worker = WhisperWorker()
+    worker.start()
+    while worker.state not in (READY, MOCK, FAILED):
+        time.sleep(0.1)
+    if worker.state != READY:
+        worker.stop()
+        error = worker.health()["error"] or "openai-whisper not installed"
+        raise SystemExit(f"Whisper worker is {worker.state}: {error}")
+    return worker
+
+
+async def run_load(worker: WhisperWorker, clip: np.ndarray, rate: float, jobs: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    latencies = []
+    counters = metrics.snapshot()["counters"]
+    batched_before = counters.get("whisper_batched_jobs", 0)
+    jobs_before = counters.get("whisper_jobs", 0)
+
+    async def job():
+        start = time.perf_counter()
+        await worker.transcribe(clip)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tasks = []
+    for gap in rng.exponential(1 / rate, jobs):
+        tasks.append(asyncio.create_task(job()))
+        await asyncio.sleep(gap)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    counters = metrics.snapshot()["counters"]
+    latencies.sort()
+    return {
+        "jobs_per_sec": jobs / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "batched": (counters.get("whisper_batched_jobs", 0) - batched_before)
+        / max(1, counters.get("whisper_jobs", 0) - jobs_before),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--audio", help="Voice clip (WAV or anything ffmpeg reads) used for every job")
+    parser.add_argument("--windows", type=int, nargs="+", default=list(WINDOWS_MS), help="Batch windows (ms)")
+    parser.add_argument("--rates", type=float, nargs="+", default=list(RATES), help="Arrivals (clips/sec)")
+    parser.add_argument("--jobs", type=int, default=30, help="Clips per window and rate")
+    parser.add_argument("--max-size", type=int, default=settings.whisper_batch_max_size, help="Most clips per batch")
+    args = parser.parse_args()
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            clip = decode_audio(f.read())
+    else:
+        clip = _synthetic_clip()
+
+    print(
+        f"model {settings.whisper_model}, {len(clip) / SAMPLE_RATE:.1f} s clip, "
+        f"{args.jobs} jobs per run, max batch {args.max_size}"
+    )
+    print(f"{'window ms':>10}{'rate/s':>8}{'jobs/s':>8}{'p50 ms':>10}{'p99 ms':>10}{'batched':>9}")
+    for window_ms in args.windows:
+        worker = _start(window_ms, args.max_size)
+        try:
+            for rate in args.rates:
+                result = asyncio.run(run_load(worker, clip, rate, args.jobs))
+                print(
+                    f"{window_ms:>10}{rate:>8g}{result['jobs_per_sec']:>8.2f}"
+                    f"{result['p50_ms']:>10.0f}{result['p99_ms']:>10.0f}{result['batched']:>9.0%}"
+                )
+        finally:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ Core module for application configuration, logging, and infrastructure.
 from core.config import settings, get_settings, Environment
 from core.logging import logger, bind_context, clear_context, get_logger
 from core.limiter import limiter, get_limiter
+from core.metrics import metrics, get_metrics
+from core.upload_limit import UploadSizeLimitMiddleware
 
 __all__ = [
     "settings",
@@ -15,4 +17,7 @@ __all__ = [
     "get_logger",
     "limiter",
     "get_limiter",
+    "metrics",
+    "get_metrics",
+    "UploadSizeLimitMiddleware",
 ]
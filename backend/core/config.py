@@ -58,11 +58,48 @@ class Settings(BaseSettings):
     # ==========================
     database_url: Optional[str] = Field(default=None)
     
+    # SQLite connection pragmas (applied to every new connection)
+    sqlite_journal_mode: str = Field(default="WAL")  # WAL lets readers run alongside a writer
+    sqlite_synchronous: str = Field(default="NORMAL")  # safe with WAL, fewer fsyncs than FULL
+    sqlite_busy_timeout_ms: int = Field(default=5000)  # wait for locks instead of failing
+    sqlite_cache_size_kb: int = Field(default=64000)  # page cache per connection
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024)  # bytes of the DB file to memory-map
+    sqlite_temp_store: str = Field(default="MEMORY")  # temp tables/indexes in RAM
+    
     # ==========================
     # Whisper/Voice Settings
     # ==========================
     whisper_model: str = Field(default="base")
     use_mock_whisper: bool = Field(default=True)  # Use mock for demo/testing
+    whisper_job_timeout_seconds: int = Field(default=60)  # Fail a transcription job that takes longer
+    whisper_max_restarts: int = Field(default=5)  # Consecutive worker crashes before giving up (state "failed")
+    whisper_batch_window_ms: int = Field(default=30)  # Wait this long for more jobs to batch with (0 = only already queued)
+    whisper_batch_max_size: int = Field(default=8)  # Most clips decoded in one batch
+    voice_debug_audio_files: bool = Field(default=False)  # Keep uploads in data/audio and transcribe from disk
+    transcript_cache_size: int = Field(default=1000)  # Transcripts kept in memory (LRU)
+    transcript_cache_disk_entries: int = Field(default=20000)  # Transcript files kept under data/transcripts
+    voice_stream_partial_seconds: float = Field(default=1.0)  # New audio needed before the next partial transcript
+    voice_stream_window_seconds: int = Field(default=30)  # Partials re-transcribe at most this much recent audio
+    voice_stream_max_seconds: int = Field(default=60)  # Streams are finalized at this length
+    
+    # ==========================
+    # Face Processing
+    # ==========================
+    face_workers: int = Field(default_factory=lambda: min(4, os.cpu_count() or 1))
+    face_queue_depth: int = Field(default=16)  # jobs waiting beyond busy workers before 503
+    face_retry_after_seconds: int = Field(default=1)  # Retry-After sent when saturated
+    face_detect_max_dimension: int = Field(default=1280)  # Detect on a frame downscaled to this (0 = full size)
+    face_identify_refresh_seconds: int = Field(default=60)  # Rebuild identify candidates at least this often
+    face_batch_max_frames: int = Field(default=8)  # Frames accepted by /api/face/detect-batch
+    
+    # ==========================
+    # Photo Serving
+    # ==========================
+    photo_max_upload_mb: int = Field(default=10)  # Larger photo uploads are rejected with 413
+    photo_variant_widths: str = Field(default="64,128,256,512")  # ?w= is rounded up to one of these
+    photo_variant_cache_mb: int = Field(default=256)  # LRU cap for resized variants on disk
+    photo_gc_grace_hours: int = Field(default=24)  # Unreferenced photos younger than this are kept
+    photo_gc_interval_hours: int = Field(default=6)  # How often the photo GC job runs
     
     # ==========================
     # Rate Limiting
@@ -75,6 +112,15 @@ class Settings(BaseSettings):
     # Visitor Settings
     # ==========================
     default_approval_duration: int = Field(default=90)  # minutes
+    default_country_code: str = Field(default="971")  # for local phone numbers (UAE)
+    
+    # ==========================
+    # Realtime Events (SSE)
+    # ==========================
+    events_history_size: int = Field(default=1000)  # events kept for Last-Event-ID replay
+    events_queue_size: int = Field(default=100)  # per-client buffer before it is dropped
+    events_heartbeat_seconds: int = Field(default=15)  # keep-alive comment interval
+    events_retry_ms: int = Field(default=3000)  # client reconnect delay hint
     
     # ==========================
     # Logging
@@ -101,6 +147,20 @@ class Settings(BaseSettings):
         path.mkdir(exist_ok=True)
         return path
     
+    @property
+    def photo_variants_dir(self) -> Path:
+        """Get resized photo variant cache directory path."""
+        path = self.data_dir / "photo_variants"
+        path.mkdir(exist_ok=True)
+        return path
+    
+    @property
+    def transcripts_dir(self) -> Path:
+        """Get transcript cache directory path."""
+        path = self.data_dir / "transcripts"
+        path.mkdir(exist_ok=True)
+        return path
+    
     @property
     def audio_dir(self) -> Path:
         """Get audio directory path."""
@@ -115,6 +175,21 @@ class Settings(BaseSettings):
             return self.database_url
         return f"sqlite:///{self.data_dir / 'database.db'}"
     
+    @property
+    def async_db_url(self) -> str:
+        """Get database URL with an async driver (aiosqlite / asyncpg)."""
+        url = self.db_url
+        if url.startswith("sqlite:"):
+            return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+        if url.startswith("postgresql:"):
+            return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+        return url
+    
+    @property
+    def is_sqlite(self) -> bool:
+        """Check if the database is SQLite."""
+        return self.db_url.startswith("sqlite")
+    
     @property
     def is_development(self) -> bool:
         """Check if running in development mode."""
@@ -125,6 +200,10 @@ class Settings(BaseSettings):
         """Check if running in production mode."""
         return self.app_env == Environment.PRODUCTION
     
+    def get_photo_variant_widths(self) -> List[int]:
+        """Parse allowed photo variant widths from string."""
+        return sorted(int(w) for w in self.photo_variant_widths.split(",") if w.strip())
+    
     def get_cors_origins(self) -> List[str]:
         """Parse CORS origins from string."""
         if self.allowed_origins == "*":
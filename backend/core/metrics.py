@@ -0,0 +1,60 @@
+"""
+In-process metrics registry
+Counters and timings recorded by services, exposed on GET /metrics
+"""
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+# Recent samples kept per timing for percentile estimates
+TIMING_WINDOW = 1000
+
+
+class Metrics:
+    """Thread-safe counters and rolling timing windows"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._timing_counts: Dict[str, int] = {}
+        self._timings: Dict[str, Deque[float]] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add `value` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a duration sample."""
+        with self._lock:
+            if name not in self._timings:
+                self._timings[name] = deque(maxlen=TIMING_WINDOW)
+                self._timing_counts[name] = 0
+            self._timings[name].append(seconds)
+            self._timing_counts[name] += 1
+
+    def snapshot(self) -> dict:
+        """Counters plus count / avg / p50 / p99 (ms) for each timing."""
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {name: sorted(samples) for name, samples in self._timings.items()}
+            counts = dict(self._timing_counts)
+
+        summary = {}
+        for name, samples in timings.items():
+            summary[name] = {
+                "count": counts[name],
+                "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+                "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 2),
+            }
+
+        return {"counters": counters, "timings": summary}
+
+
+metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Get the process-wide metrics registry."""
+    return metrics
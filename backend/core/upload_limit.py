@@ -0,0 +1,55 @@
+"""
+Request body size limits for upload endpoints
+Starlette spools a multipart body to disk before the endpoint runs, so a
+limit checked while reading the UploadFile only triggers once the whole
+body has already been received. This middleware enforces the limit at the
+ASGI layer instead: a declared Content-Length over the limit is answered
+with 413 before any of the body is read, and a body without one (chunked)
+is counted as it arrives and cut off as soon as it passes the limit.
+"""
+from typing import Dict
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+# Room for multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _too_large(limit: int) -> str:
+    return f"Upload exceeds {limit // (1024 * 1024)} MB limit"
+
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies over a per-path byte limit before they are parsed"""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        # path -> largest accepted file payload; the body may add multipart overhead
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_body = limit + MULTIPART_OVERHEAD_BYTES
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+            response = JSONResponse({"detail": _too_large(limit)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    raise HTTPException(status_code=413, detail=_too_large(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,8 +1,10 @@
 """
 SQLite connection & session management
 Production-grade with proper connection pooling
+Sync (SessionLocal/get_db) and async (AsyncSessionLocal/get_async_db) paths share one database
 """
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from core import settings, logger
@@ -13,11 +15,47 @@ settings.data_dir.mkdir(exist_ok=True)
 # Create engine with proper pooling settings
 engine = create_engine(
     settings.db_url,
-    connect_args={"check_same_thread": False},  # SQLite specific
-    pool_pre_ping=True,  # Check connection health before using
+    connect_args={"check_same_thread": False} if settings.is_sqlite else {},
+    # A local SQLite file cannot drop the connection; pinging is a wasted round trip
+    pool_pre_ping=not settings.is_sqlite,
 )
 
+# Async engine for endpoints that run on the event loop instead of the threadpool
+async_engine = create_async_engine(
+    settings.async_db_url,
+    pool_pre_ping=not settings.is_sqlite,
+)
+
+
+def sqlite_pragmas() -> list:
+    """PRAGMA statements applied to every new SQLite connection"""
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}",  # negative = KiB
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each pooled SQLite connection (WAL keeps guard reads from blocking on approvals)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+if settings.is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -31,11 +69,21 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and apply pending schema migrations"""
     # Import models to register them
     import models
+    from migrations import run_migrations
+    from services.visitor_search import setup_search_index
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    setup_search_index(engine)
     logger.info("database_tables_created")
 
 
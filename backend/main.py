@@ -3,18 +3,25 @@ FastAPI app entry point - Visitor Management System
 Production-grade setup with structured logging and rate limiting
 """
 from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI, Request, status, Depends, HTTPException
+from fastapi import FastAPI, Request, status, Depends, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
-from core import settings, logger, limiter, bind_context, clear_context
-from database import init_db, seed_demo_data
-from api import visitors, residents, guards, voice, recurring, calendar, face
+from core import settings, logger, limiter, metrics, bind_context, clear_context, UploadSizeLimitMiddleware
+from database import init_db, seed_demo_data, async_engine
+from background.scheduler import start_background_jobs, shutdown_background_jobs
+from api import visitors, residents, guards, voice, recurring, calendar, face, events
 from auth import demo_login, verify_token
 from schemas import LoginRequest, TokenResponse
+from services.face_pool import face_pool, FacePoolSaturated
+from services.face_service import reference_descriptor
+from services.photo_manager import photo_manager, PhotoTooLarge
+from services.transcript_cache import transcript_cache
+from services.whisper_worker import whisper_worker
 
 
 @asynccontextmanager
@@ -33,8 +40,14 @@ async def lifespan(app: FastAPI):
     init_db()
     seed_demo_data()
     logger.info("database_initialized", message="Demo data seeded")
+    whisper_worker.start()  # Loads and warms the model in the background
+    start_background_jobs()  # Photo GC
     yield
     # Shutdown
+    await async_engine.dispose()
+    shutdown_background_jobs()
+    face_pool.shutdown()
+    whisper_worker.stop()
     logger.info("application_shutdown")
 
 
@@ -63,6 +76,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ==================================================
+# Upload Size Limits (enforced before multipart parsing)
+# ==================================================
+PHOTO_UPLOAD_BYTES = settings.photo_max_upload_mb * 1024 * 1024
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/auth/upload-photo": PHOTO_UPLOAD_BYTES,
+        "/api/face/detect": PHOTO_UPLOAD_BYTES,
+        "/api/face/detect-batch": PHOTO_UPLOAD_BYTES * settings.face_batch_max_frames,
+        "/api/face/verify": PHOTO_UPLOAD_BYTES * 2,
+        "/api/face/capture": PHOTO_UPLOAD_BYTES,
+        "/api/face/verify-identity": PHOTO_UPLOAD_BYTES,
+        "/api/face/identify": PHOTO_UPLOAD_BYTES,
+    },
+)
+
 # Include routers
 app.include_router(visitors.router)
 app.include_router(residents.router)
@@ -71,6 +101,7 @@ app.include_router(voice.router)
 app.include_router(recurring.router)
 app.include_router(calendar.router)
 app.include_router(face.router)
+app.include_router(events.router)
 
 
 # ============== Auth Endpoints ==============
@@ -168,8 +199,6 @@ async def upload_profile_photo(
     """Upload profile photo for current resident"""
     from database import SessionLocal
     from models import Resident
-    import base64, uuid
-    from pathlib import Path
     
     if token_data.get("user_type") != "resident":
         raise HTTPException(status_code=403, detail="Only residents can upload photos")
@@ -181,13 +210,20 @@ async def upload_profile_photo(
         if not photo:
             raise HTTPException(status_code=400, detail="No photo provided")
         
-        # Save file
-        contents = await photo.read()
-        filename = f"resident_{token_data['user_id']}_{uuid.uuid4().hex[:8]}.jpg"
-        photos_dir = Path(__file__).parent / "data" / "photos"
-        photos_dir.mkdir(parents=True, exist_ok=True)
-        filepath = photos_dir / filename
-        filepath.write_bytes(contents)
+        # Stream to disk in chunks (content-addressed; identical bytes share one blob)
+        try:
+            filename = await photo_manager.store_upload(photo)
+        except PhotoTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        if not filename:
+            raise HTTPException(status_code=400, detail="Empty photo")
+        
+        # Precompute the face descriptor used by /api/face/verify-identity;
+        # if the face pool is busy it is computed on first verification instead
+        try:
+            await face_pool.run(reference_descriptor, filename)
+        except FacePoolSaturated:
+            pass
         
         photo_url = f"/api/photos/{filename}"
         
@@ -204,15 +240,33 @@ async def upload_profile_photo(
 
 
 @app.get("/api/photos/{filename}")
-async def serve_photo(filename: str):
-    """Serve uploaded photos"""
-    from fastapi.responses import FileResponse
-    from pathlib import Path
+async def serve_photo(
+    filename: str,
+    w: Optional[int] = Query(None, ge=1, le=4096),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Serve uploaded photos; ?w= serves a cached resized variant (e.g. w=128 for avatars).
+    Photos are immutable: strong ETag, Cache-Control immutable, 304 on
+    If-None-Match, and Range requests for partial downloads.
+    """
+    from fastapi.responses import FileResponse, Response
+    from starlette.concurrency import run_in_threadpool
+    from services.photo_manager import etag_matches, PHOTO_CACHE_CONTROL
     
-    filepath = Path(__file__).parent / "data" / "photos" / filename
-    if not filepath.exists():
+    resolved = await run_in_threadpool(photo_manager.resolve, filename, w)
+    if not resolved:
         raise HTTPException(status_code=404, detail="Photo not found")
-    return FileResponse(filepath)
+    filepath, etag = resolved
+    
+    cache_headers = {"ETag": etag, "Cache-Control": PHOTO_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    return FileResponse(
+        filepath,
+        media_type="image/jpeg" if w is not None else None,
+        headers=cache_headers,
+    )
 
 
 # ============== Health & Info Endpoints ==============
@@ -233,7 +287,8 @@ def read_root():
             "guards": "/api/guards",
             "voice": "/api/voice",
             "recurring": "/api/recurring-visitors",
-            "calendar": "/api/calendar"
+            "calendar": "/api/calendar",
+            "events": "/api/events"
         }
     }
 
@@ -262,13 +317,29 @@ def health_check():
             "status": "healthy" if db_healthy else "degraded",
             "components": {
                 "api": "healthy",
-                "database": "healthy" if db_healthy else "unhealthy"
+                "database": "healthy" if db_healthy else "unhealthy",
+                "whisper": whisper_worker.state,
             },
             "version": settings.version,
         }
     )
 
 
+@app.get("/metrics")
+def get_metrics():
+    """In-process counters and timings (face pool queue wait / compute, etc.)"""
+    return {
+        **metrics.snapshot(),
+        "face_pool": {
+            "workers": face_pool.workers,
+            "capacity": face_pool.capacity,
+            "in_flight": face_pool.in_flight,
+        },
+        "whisper": whisper_worker.health(),
+        "transcript_cache": transcript_cache.stats(),
+    }
+
+
 # ============== Demo/Test Endpoints ==============
 
 @app.get("/api/demo/quick-test")
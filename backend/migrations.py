@@ -0,0 +1,136 @@
+"""
+Lightweight schema migrations for existing database files
+create_all() only creates missing tables; columns and indexes added to
+existing tables are applied here. Each migration runs once and is recorded
+in the schema_migrations table. Migrations must be idempotent, because on
+a fresh database create_all() has already built the final schema.
+"""
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from core import logger
+from database import Base
+
+
+def add_column(conn: Connection, table_name: str, column_name: str) -> bool:
+    """Add a model column to an existing table. Returns False if it already exists."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        return False
+
+    column = Base.metadata.tables[table_name].columns[column_name]
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+    logger.info("database_column_added", table=table_name, column=column_name)
+    return True
+
+
+def create_indexes(conn: Connection, table_name: str, *index_names: str):
+    """Create model indexes on an existing table if missing."""
+    for index in Base.metadata.tables[table_name].indexes:
+        if index.name in index_names:
+            index.create(conn, checkfirst=True)
+
+
+# ============== Migrations ==============
+
+def _visitor_phone_e164(conn: Connection):
+    """Visitor.phone_e164 + index, backfilled from the raw phone column"""
+    from utils.phone import normalize_phone
+
+    add_column(conn, "visitors", "phone_e164")
+    create_indexes(conn, "visitors", "ix_visitors_phone_e164")
+
+    rows = conn.execute(text(
+        "SELECT id, phone FROM visitors WHERE phone IS NOT NULL AND phone_e164 IS NULL"
+    )).all()
+    for visitor_id, phone in rows:
+        conn.execute(
+            text("UPDATE visitors SET phone_e164 = :phone_e164 WHERE id = :id"),
+            {"phone_e164": normalize_phone(phone), "id": visitor_id}
+        )
+    logger.info("visitor_phones_backfilled", count=len(rows))
+
+
+def _approval_composite_indexes(conn: Connection):
+    """Composite indexes for the status / time-window / per-resident approval queries"""
+    create_indexes(
+        conn, "approvals",
+        "ix_approvals_visitor_created",
+        "ix_approvals_status_valid_until",
+        "ix_approvals_status_created",
+        "ix_approvals_resident_status_created",
+        "ix_approvals_resident_method_created",
+    )
+
+
+def _visitor_search_phone_e164(conn: Connection):
+    """
+    Re-normalize visitor phones (bare digit fragments are no longer numbers)
+    and index phone_e164 for search. The SQLite FTS table changes columns, so
+    it is dropped here and recreated and backfilled by setup_search_index().
+    """
+    from services.visitor_search import SQLITE_SEARCH_DROP
+    from utils.phone import normalize_phone
+
+    rows = conn.execute(text("SELECT id, phone FROM visitors WHERE phone IS NOT NULL")).all()
+    for visitor_id, phone in rows:
+        conn.execute(
+            text("UPDATE visitors SET phone_e164 = :phone_e164 WHERE id = :id"),
+            {"phone_e164": normalize_phone(phone), "id": visitor_id}
+        )
+    logger.info("visitor_phones_backfilled", count=len(rows))
+
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_SEARCH_DROP:
+            conn.execute(text(statement))
+
+
+def _reset_face_descriptors(conn: Connection):
+    """
+    Descriptors changed from zero-mean vectors to normalized histograms of the
+    same size; drop them so they are recomputed on first use
+    """
+    deleted = conn.execute(text("DELETE FROM face_descriptors")).rowcount
+    logger.info("face_descriptors_reset", count=deleted)
+
+
+# Applied in order; never rename or reorder an entry once released
+MIGRATIONS = [
+    ("0001_visitor_phone_e164", _visitor_phone_e164),
+    ("0002_approval_composite_indexes", _approval_composite_indexes),
+    ("0003_visitor_search_phone_e164", _visitor_search_phone_e164),
+    ("0004_reset_face_descriptors", _reset_face_descriptors),
+]
+
+
+def run_migrations(engine: Engine) -> list:
+    """
+    Apply pending migrations, each in its own transaction.
+
+    Returns:
+        Names of the migrations applied by this call
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+        ))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+    newly_applied = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+                {"name": name, "applied_at": datetime.utcnow()}
+            )
+        newly_applied.append(name)
+        logger.info("database_migration_applied", migration=name)
+
+    return newly_applied
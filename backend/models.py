@@ -2,7 +2,7 @@
 SQLAlchemy ORM models - Visitor Management System
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -33,6 +33,7 @@ class Visitor(Base):
     purpose = Column(String(255), nullable=True)
     photo_url = Column(String(500), nullable=True)
     phone = Column(String(20), nullable=True)
+    phone_e164 = Column(String(20), nullable=True, index=True)  # normalized phone for lookups
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     approvals = relationship("Approval", back_populates="visitor")
@@ -57,6 +58,20 @@ class Approval(Base):
     resident = relationship("Resident", back_populates="approvals")
     visitor = relationship("Visitor", back_populates="approvals")
 
+    # Existing database files get these through migrations.py
+    __table_args__ = (
+        # Latest-approval-per-visitor lookups (guard search, check-by-name, check-status)
+        Index("ix_approvals_visitor_created", "visitor_id", "created_at"),
+        # Active approvals and expiry sweep: status = 'approved' AND valid_until range
+        Index("ix_approvals_status_valid_until", "status", "valid_until"),
+        # Expected today / pending list: status IN (...) AND created_at range
+        Index("ix_approvals_status_created", "status", "created_at"),
+        # Resident dashboard: pending approvals and today's schedule, newest first
+        Index("ix_approvals_resident_status_created", "resident_id", "status", "created_at"),
+        # Calendar-synced events per resident, newest first
+        Index("ix_approvals_resident_method_created", "resident_id", "approval_method", "created_at"),
+    )
+
 
 class RecurringVisitor(Base):
     """Recurring visitor schedule"""
@@ -97,3 +112,28 @@ class AuditLog(Base):
     guard_id = Column(Integer, ForeignKey("guards.id"), nullable=True)
     action = Column(String(50), nullable=False)  # approval_requested, approved, denied, checked_in, etc.
     details = Column(Text, nullable=True)  # JSON string for extra info
+
+
+class FaceDescriptor(Base):
+    """Precomputed face descriptor for a stored photo (see services/face_descriptors.py)"""
+    __tablename__ = "face_descriptors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    photo_filename = Column(String(255), unique=True, index=True, nullable=False)
+    content_hash = Column(String(64), index=True, nullable=False)  # SHA-256 of the photo bytes
+    descriptor = Column(LargeBinary, nullable=True)  # float16 histogram; NULL when no face was found
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PhotoBlob(Base):
+    """
+    Content-addressed photo file, stored once per SHA-256 (see services/photo_manager.py).
+    Referenced through Visitor / Resident / RecurringVisitor.photo_url; unreferenced
+    blobs are removed by background/photo_gc.py.
+    """
+    __tablename__ = "photo_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    stored_at = Column(DateTime, default=datetime.utcnow, index=True)  # last upload of these bytes
@@ -0,0 +1,150 @@
+"""
+Process-local cache of approval state for guard gate checks
+Serves /api/guards/active-approvals and /api/visitors/check-status/{visitor_id}
+without touching the database. Every endpoint that creates or changes an
+approval calls approval_cache.invalidate() after committing; windows that
+end are evicted from a valid_until heap instead of being re-queried.
+"""
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from models import Approval
+
+# Bound on per-visitor check-status entries kept between invalidations
+MAX_CACHED_VISITORS = 10000
+
+# Returned by get_latest() for visitors not in the cache (None means "no approvals")
+MISS = object()
+
+
+def _snapshot(approval: Approval) -> dict:
+    """Plain-data copy of an approval with its visitor and resident fields"""
+    visitor = approval.visitor
+    resident = approval.resident
+    return {
+        "approval_id": approval.id,
+        "visitor_id": approval.visitor_id,
+        "resident_id": approval.resident_id,
+        "status": approval.status,
+        "valid_from": approval.valid_from,
+        "valid_until": approval.valid_until,
+        "visitor_name": visitor.name if visitor else None,
+        "purpose": visitor.purpose if visitor else None,
+        "photo_url": visitor.photo_url if visitor else None,
+        "apt_number": resident.apt_number if resident else None,
+        "resident_name": resident.name if resident else None,
+    }
+
+
+class ActiveApprovalCache:
+    """
+    Approved approvals whose window has not ended, keyed by approval id and
+    ordered by valid_until, plus the latest approval per visitor.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._loaded = False
+        self._by_id: Dict[int, dict] = {}
+        self._expiry_heap: List[Tuple[datetime, int]] = []
+        self._latest_by_visitor: Dict[int, Optional[dict]] = {}
+
+    @property
+    def generation(self) -> int:
+        """Bumped on every invalidate(); lets derived caches detect approval changes"""
+        return self._generation
+
+    def invalidate(self):
+        """Drop everything; the next read reloads from the database"""
+        with self._lock:
+            self._generation += 1
+            self._loaded = False
+            self._by_id = {}
+            self._expiry_heap = []
+            self._latest_by_visitor = {}
+
+    # ============== Active approvals ==============
+
+    def get_active(self, now: datetime) -> Optional[List[dict]]:
+        """
+        Approvals valid at `now`, soonest-expiring first.
+        Returns None when the cache is cold (call load_active).
+        """
+        with self._lock:
+            if not self._loaded:
+                return None
+
+            while self._expiry_heap and self._expiry_heap[0][0] < now:
+                _, approval_id = heapq.heappop(self._expiry_heap)
+                self._by_id.pop(approval_id, None)
+
+            return [
+                self._by_id[approval_id]
+                for _, approval_id in sorted(self._expiry_heap)
+                if self._by_id[approval_id]["valid_from"] <= now
+            ]
+
+    def load_active(self, db: Session, now: Optional[datetime] = None) -> List[dict]:
+        """Load approved, not-yet-ended approvals and return those valid at `now`"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            generation = self._generation
+
+        approvals = db.query(Approval).options(
+            joinedload(Approval.visitor),
+            joinedload(Approval.resident)
+        ).filter(
+            Approval.status == "approved",
+            Approval.valid_from != None,
+            Approval.valid_until >= now
+        ).all()
+        snapshots = [_snapshot(a) for a in approvals if a.visitor and a.resident]
+
+        with self._lock:
+            # A write committed while we were querying; serve this result but don't keep it
+            if generation == self._generation:
+                self._by_id = {s["approval_id"]: s for s in snapshots}
+                self._expiry_heap = [(s["valid_until"], s["approval_id"]) for s in snapshots]
+                heapq.heapify(self._expiry_heap)
+                self._loaded = True
+
+        snapshots.sort(key=lambda s: s["valid_until"])
+        return [s for s in snapshots if s["valid_from"] <= now]
+
+    # ============== Latest approval per visitor ==============
+
+    def get_latest(self, visitor_id: int):
+        """
+        Most recent approval (any status) for a visitor; None if they have none.
+        Returns MISS when the visitor is not cached (call load_latest).
+        """
+        with self._lock:
+            return self._latest_by_visitor.get(visitor_id, MISS)
+
+    def load_latest(self, db: Session, visitor_id: int) -> Optional[dict]:
+        """Load and cache a visitor's most recent approval"""
+        with self._lock:
+            generation = self._generation
+
+        approval = db.query(Approval).options(
+            joinedload(Approval.visitor),
+            joinedload(Approval.resident)
+        ).filter(
+            Approval.visitor_id == visitor_id
+        ).order_by(Approval.created_at.desc()).first()
+        snapshot = _snapshot(approval) if approval else None
+
+        with self._lock:
+            if generation == self._generation:
+                if len(self._latest_by_visitor) >= MAX_CACHED_VISITORS:
+                    self._latest_by_visitor = {}
+                self._latest_by_visitor[visitor_id] = snapshot
+        return snapshot
+
+
+approval_cache = ActiveApprovalCache()
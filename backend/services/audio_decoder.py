@@ -0,0 +1,144 @@
+"""
+In-memory audio decoding for Whisper
+Uploaded voice clips are decoded straight from bytes to the 16 kHz mono
+float32 array Whisper consumes, with no temp file. PCM WAV (what most
+recorders send) is parsed with the standard library; any other container
+(webm/ogg/m4a/mp3) is piped through ffmpeg stdin -> stdout. Streamed
+chunks from /api/voice/stream are raw 16-bit PCM.
+"""
+import io
+import shutil
+import subprocess
+import wave
+from math import gcd
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper's input rate
+
+FFMPEG_TIMEOUT_SECONDS = 30
+
+
+class AudioDecodeError(Exception):
+    """Raised when uploaded audio cannot be decoded"""
+
+
+def _pcm_to_float(frames: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 1:  # unsigned 8-bit
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        return ints.astype(np.float32) / float(1 << 23)
+    if sample_width == 4:
+        return np.frombuffer(frames, dtype="<i4").astype(np.float32) / float(1 << 31)
+    raise AudioDecodeError(f"Unsupported WAV sample width: {sample_width}")
+
+
+# Windowed-sinc low-pass for resample(): taps per side at the slower rate and
+# Kaiser beta, as in scipy.signal.resample_poly (~ -55 dB stopband)
+RESAMPLE_HALF_TAPS = 10
+RESAMPLE_KAISER_BETA = 5.0
+
+# Output samples filtered per step; bounds the (chunk x taps) gather arrays
+RESAMPLE_CHUNK = 16384
+
+
+def resample(samples: np.ndarray, rate: int, target: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Polyphase windowed-sinc resample by target/rate.
+
+    The low-pass cuts off at the lower of the two Nyquist frequencies, so
+    content above 8 kHz in 44.1/48 kHz recordings (sibilants, fricatives)
+    is filtered out instead of aliasing down into the speech band.
+    """
+    if rate == target or len(samples) == 0:
+        return samples
+    g = gcd(rate, target)
+    up, down = target // g, rate // g
+
+    # Prototype filter at the upsampled rate (rate * up), gain `up` to make up for zero-stuffing
+    max_rate = max(up, down)
+    half = RESAMPLE_HALF_TAPS * max_rate
+    offsets = np.arange(-half, half + 1)
+    h = np.sinc(offsets / max_rate) * np.kaiser(len(offsets), RESAMPLE_KAISER_BETA)
+    h *= up / h.sum()
+
+    # Output n sits at upsampled position t = n * down and draws on inputs t // up + taps,
+    # weighted by the row of the filter for its phase t % up
+    taps = np.arange(-(half // up) - 1, half // up + 2)
+    u = np.arange(up)[:, None] - taps[None, :] * up + half
+    phases = np.where((u >= 0) & (u < len(h)), h[np.clip(u, 0, len(h) - 1)], 0.0)
+
+    pad = len(taps)
+    padded = np.concatenate([np.zeros(pad), samples, np.zeros(pad)])
+    out = np.empty(len(samples) * up // down, dtype=np.float32)
+    for start in range(0, len(out), RESAMPLE_CHUNK):
+        t = np.arange(start, min(start + RESAMPLE_CHUNK, len(out))) * down
+        window = padded[(t // up + pad)[:, None] + taps[None, :]]
+        out[start:start + len(t)] = np.einsum("ij,ij->i", window, phases[t % up])
+    return out
+
+
+def decode_pcm16(data: bytes, rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Raw little-endian 16-bit mono PCM (streamed chunks) -> 16 kHz float32"""
+    return resample(_pcm_to_float(data[: len(data) - len(data) % 2], 2), rate)
+
+
+def decode_wav(data: bytes) -> np.ndarray:
+    """PCM WAV bytes -> 16 kHz mono float32"""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            channels = wav.getnchannels()
+            sample_width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(f"Invalid WAV audio: {e}")
+
+    samples = _pcm_to_float(frames, sample_width)
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate)
+
+
+def decode_with_ffmpeg(data: bytes) -> np.ndarray:
+    """Any ffmpeg-readable container -> 16 kHz mono float32, via pipes"""
+    if shutil.which("ffmpeg") is None:
+        raise AudioDecodeError("ffmpeg is required to decode non-WAV audio")
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    try:
+        out = subprocess.run(
+            cmd, input=data, capture_output=True, check=True, timeout=FFMPEG_TIMEOUT_SECONDS
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(f"ffmpeg could not decode audio: {e.stderr.decode(errors='ignore')[-200:]}")
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError("ffmpeg timed out decoding audio")
+    return np.frombuffer(out, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """
+    Decode uploaded audio bytes to a 16 kHz mono float32 array.
+
+    Raises:
+        AudioDecodeError: empty, corrupt or undecodable audio
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio")
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return decode_wav(data)
+        except AudioDecodeError:
+            pass  # e.g. float or compressed WAV; let ffmpeg handle it
+    return decode_with_ffmpeg(data)
@@ -0,0 +1,156 @@
+"""
+Face descriptor store
+Descriptors of stored visitor / resident photos, keyed by photo filename and
+content hash and persisted in the face_descriptors table. A gate check then
+only has to process the live capture; the reference side is a lookup.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import FaceDescriptor
+
+# Descriptors kept in memory in front of the table
+MAX_CACHED_DESCRIPTORS = 5000
+
+# Descriptor format: L2-normalized BGR histogram with these bins, stored as
+# float16. Rows in an older format are treated as missing and recomputed on
+# use (same-size rows of an older format are cleared by migration 0004).
+DESCRIPTOR_BINS = (32, 32, 32)  # The binning verify_faces has always used
+DESCRIPTOR_SIZE = DESCRIPTOR_BINS[0] * DESCRIPTOR_BINS[1] * DESCRIPTOR_BINS[2]
+DESCRIPTOR_BYTES = DESCRIPTOR_SIZE * np.dtype(np.float16).itemsize
+
+PHOTO_URL_PREFIX = "/api/photos/"
+
+# Returned by get() for photos with no stored descriptor (None means "no face in photo")
+MISS = object()
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of photo bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def photo_filename(photo_url: Optional[str]) -> Optional[str]:
+    """Filename of a locally stored photo from its /api/photos/... URL"""
+    if not photo_url or not photo_url.startswith(PHOTO_URL_PREFIX):
+        return None
+    filename = photo_url[len(PHOTO_URL_PREFIX):]
+    if not filename or "/" in filename or "\\" in filename or filename.startswith("."):
+        return None
+    return filename
+
+
+def _to_blob(descriptor: Optional[np.ndarray]) -> Optional[bytes]:
+    return descriptor.astype(np.float16).tobytes() if descriptor is not None else None
+
+
+def _from_blob(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    return np.frombuffer(blob, dtype=np.float16).astype(np.float32) if blob is not None else None
+
+
+def _is_current(blob: Optional[bytes]) -> bool:
+    return blob is None or len(blob) == DESCRIPTOR_BYTES
+
+
+class FaceDescriptorStore:
+    """Read-through LRU cache over the face_descriptors table"""
+
+    def __init__(self, max_cached: int = MAX_CACHED_DESCRIPTORS):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[str, Optional[np.ndarray]]]" = OrderedDict()
+        self._max_cached = max_cached
+
+    def _remember(self, filename: str, photo_hash: str, descriptor: Optional[np.ndarray]):
+        with self._lock:
+            self._cache[filename] = (photo_hash, descriptor)
+            self._cache.move_to_end(filename)
+            while len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+
+    def get(self, filename: str):
+        """
+        Descriptor for a stored photo; None if the photo has no face.
+        Returns MISS when nothing is stored for the file.
+        """
+        with self._lock:
+            cached = self._cache.get(filename)
+            if cached is not None:
+                self._cache.move_to_end(filename)
+                return cached[1]
+
+        db = SessionLocal()
+        try:
+            row = db.query(FaceDescriptor).filter(FaceDescriptor.photo_filename == filename).first()
+        finally:
+            db.close()
+
+        if row is None or not _is_current(row.descriptor):
+            return MISS
+        descriptor = _from_blob(row.descriptor)
+        self._remember(filename, row.content_hash, descriptor)
+        return descriptor
+
+    def get_hash(self, filename: str) -> Optional[str]:
+        """Content hash the stored descriptor was computed from"""
+        with self._lock:
+            cached = self._cache.get(filename)
+        if cached is not None:
+            return cached[0]
+
+        db = SessionLocal()
+        try:
+            row = db.query(FaceDescriptor.content_hash, func.length(FaceDescriptor.descriptor)).filter(
+                FaceDescriptor.photo_filename == filename
+            ).first()
+        finally:
+            db.close()
+
+        if row is None or row[1] not in (None, DESCRIPTOR_BYTES):
+            return None
+        return row[0]
+
+    def find_by_hash(self, photo_hash: str):
+        """Descriptor already computed for identical bytes under any filename, or MISS"""
+        db = SessionLocal()
+        try:
+            row = db.query(FaceDescriptor).filter(FaceDescriptor.content_hash == photo_hash).first()
+        finally:
+            db.close()
+        if row is None or not _is_current(row.descriptor):
+            return MISS
+        return _from_blob(row.descriptor)
+
+    def put(self, filename: str, photo_hash: str, descriptor: Optional[np.ndarray]):
+        """Insert or replace the descriptor for a photo file"""
+        blob = _to_blob(descriptor)
+        db = SessionLocal()
+        try:
+            row = db.query(FaceDescriptor).filter(FaceDescriptor.photo_filename == filename).first()
+            if row is None:
+                row = FaceDescriptor(photo_filename=filename)
+                db.add(row)
+            row.content_hash = photo_hash
+            row.descriptor = blob
+            db.commit()
+        except IntegrityError:
+            # Same photo stored concurrently (identical bytes share a filename); overwrite it
+            db.rollback()
+            db.query(FaceDescriptor).filter(FaceDescriptor.photo_filename == filename).update(
+                {"content_hash": photo_hash, "descriptor": blob}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        # Cache what a later read from the table would return
+        self._remember(filename, photo_hash, _from_blob(blob))
+
+
+face_descriptor_store = FaceDescriptorStore()
@@ -0,0 +1,197 @@
+"""
+1:N face identification against today's expected visitors
+Holds the face descriptors of every visitor with an approval that is valid
+now or was requested today as one in-memory matrix, so a live capture is
+scored against all of them with a single matrix-vector product. The
+candidate set is refreshed when approvals change (approval_cache
+generation) or has aged past FACE_IDENTIFY_REFRESH_SECONDS; only visitors
+new to the set have their descriptors loaded.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+
+from core import settings, logger
+from database import SessionLocal
+from models import Approval
+from services.approval_cache import approval_cache
+from services.face_descriptors import photo_filename
+from services.face_service import FaceImage, reference_descriptor, descriptor_sums, match_confidences, MATCH_THRESHOLD
+
+DEFAULT_TOP_K = 5
+
+
+def _candidate_snapshot(approval: Approval) -> dict:
+    visitor = approval.visitor
+    resident = approval.resident
+    return {
+        "visitor_id": visitor.id,
+        "visitor_name": visitor.name,
+        "purpose": visitor.purpose,
+        "photo_url": visitor.photo_url,
+        "approval_id": approval.id,
+        "status": approval.status,
+        "valid_from": approval.valid_from,
+        "valid_until": approval.valid_until,
+        "apt_number": resident.apt_number,
+        "resident_name": resident.name,
+    }
+
+
+def load_candidates(db: Session, now: datetime) -> Dict[int, dict]:
+    """
+    Visitors with an approval valid at `now` or a pending/approved request
+    created today, keyed by visitor id. A currently valid approval wins over
+    a later request for the same visitor.
+    """
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = today_start + timedelta(days=1)
+
+    approvals = db.query(Approval).options(
+        joinedload(Approval.visitor),
+        joinedload(Approval.resident)
+    ).filter(
+        or_(
+            and_(
+                Approval.status == "approved",
+                Approval.valid_from <= now,
+                Approval.valid_until >= now
+            ),
+            and_(
+                Approval.status.in_(["pending", "approved"]),
+                Approval.created_at >= today_start,
+                Approval.created_at < today_end
+            )
+        )
+    ).order_by(Approval.created_at).all()
+
+    candidates: Dict[int, dict] = {}
+    valid_visitors = set()
+    for approval in approvals:
+        if not approval.visitor or not approval.resident:
+            continue
+        is_valid = (
+            approval.status == "approved"
+            and approval.valid_from is not None and approval.valid_until is not None
+            and approval.valid_from <= now <= approval.valid_until
+        )
+        if is_valid:
+            valid_visitors.add(approval.visitor_id)
+        elif approval.visitor_id in valid_visitors:
+            continue
+        candidates[approval.visitor_id] = _candidate_snapshot(approval)
+    return candidates
+
+
+class FaceIdentificationIndex:
+    """Descriptor matrix of today's candidate visitors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._loaded_at = 0.0
+        self._day = None
+        # visitor_id -> (photo filename, descriptor); kept across refreshes
+        self._descriptors: Dict[int, Tuple[str, np.ndarray]] = {}
+        self._candidates: List[dict] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._sums: Optional[Tuple[np.ndarray, np.ndarray]] = None  # descriptor_sums(self._matrix)
+
+    def _is_stale(self, now: datetime) -> bool:
+        return (
+            self._generation != approval_cache.generation
+            or self._day != now.date()
+            or time.monotonic() - self._loaded_at > settings.face_identify_refresh_seconds
+        )
+
+    def refresh(self, db: Session, now: Optional[datetime] = None):
+        """Reload the candidate set, loading descriptors only for new or re-photographed visitors"""
+        now = now or datetime.utcnow()
+        generation = approval_cache.generation
+        candidates = load_candidates(db, now)
+
+        descriptors: Dict[int, Tuple[str, np.ndarray]] = {}
+        loaded = 0
+        for visitor_id, candidate in candidates.items():
+            filename = photo_filename(candidate["photo_url"])
+            if not filename:
+                continue
+            known = self._descriptors.get(visitor_id)
+            if known is not None and known[0] == filename:
+                descriptors[visitor_id] = known
+                continue
+            descriptor = reference_descriptor(filename)
+            loaded += 1
+            if descriptor is not None:
+                descriptors[visitor_id] = (filename, descriptor)
+
+        rows = [candidates[visitor_id] for visitor_id in descriptors]
+        matrix = np.vstack([d for _, d in descriptors.values()]) if descriptors else None
+
+        self._descriptors = descriptors
+        self._candidates = rows
+        self._matrix = matrix
+        self._sums = descriptor_sums(matrix) if matrix is not None else None
+        self._generation = generation
+        self._day = now.date()
+        self._loaded_at = time.monotonic()
+        logger.info(
+            "face_identify_index_refreshed",
+            candidates=len(candidates), indexed=len(rows), descriptors_loaded=loaded
+        )
+
+    def ensure_fresh(self, now: Optional[datetime] = None):
+        now = now or datetime.utcnow()
+        with self._lock:
+            if not self._is_stale(now):
+                return
+            db = SessionLocal()
+            try:
+                self.refresh(db, now)
+            finally:
+                db.close()
+
+    def identify(self, probe: np.ndarray, top_k: int = DEFAULT_TOP_K) -> dict:
+        """Score `probe` against every indexed visitor and return the best `top_k`"""
+        self.ensure_fresh()
+        with self._lock:
+            matrix, sums, candidates = self._matrix, self._sums, self._candidates
+
+        if matrix is None:
+            return {"candidates": [], "searched": 0}
+
+        scores = match_confidences(probe, matrix, sums)
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for i in best:
+            confidence = float(scores[i])
+            results.append({
+                **candidates[i],
+                "confidence": confidence,
+                "match": confidence > MATCH_THRESHOLD,
+            })
+        return {"candidates": results, "searched": len(candidates)}
+
+
+face_identification_index = FaceIdentificationIndex()
+
+
+def identify_face(image_bytes: bytes, top_k: int = DEFAULT_TOP_K) -> dict:
+    """Decode a live capture and identify it against today's candidates"""
+    face_image = FaceImage.decode(image_bytes)
+    if face_image is None:
+        return {"detected": False, "candidates": [], "error": "Invalid image"}
+
+    probe = face_image.descriptor()
+    if probe is None:
+        return {"detected": False, "candidates": [], "message": "No face detected"}
+
+    return {"detected": True, **face_identification_index.identify(probe, top_k)}
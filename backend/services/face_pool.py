@@ -0,0 +1,64 @@
+"""
+Bounded worker pool for OpenCV face work
+Keeps Haar-cascade passes off the event loop. OpenCV releases the GIL
+inside its kernels, so threads give real parallelism. Work beyond
+workers + queue depth is rejected so the API can answer 503 instead of
+queueing without bound.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import settings, metrics
+
+
+class FacePoolSaturated(Exception):
+    """Raised when every worker is busy and the queue is full"""
+
+
+class FaceWorkerPool:
+    """Thread pool with a hard cap on in-flight face jobs"""
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.capacity = workers + queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="face-worker")
+        self._in_flight = 0  # only touched from the event loop
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` on a worker thread.
+        Records face_queue_wait and face_compute timings.
+
+        Raises:
+            FacePoolSaturated: if the pool is at capacity
+        """
+        if self._in_flight >= self.capacity:
+            metrics.increment("face_pool_rejected")
+            raise FacePoolSaturated()
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            metrics.observe("face_queue_wait", started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                metrics.observe("face_compute", time.perf_counter() - started)
+
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+face_pool = FaceWorkerPool(settings.face_workers, settings.face_queue_depth)
@@ -6,145 +6,401 @@ Lightweight — no TensorFlow/DeepFace required.
 import cv2
 import numpy as np
 import os
-import uuid
-from pathlib import Path
+import threading
 
-PHOTOS_DIR = Path(__file__).parent.parent / "data" / "photos"
-PHOTOS_DIR.mkdir(parents=True, exist_ok=True)
+from core import settings
+from database import SessionLocal
+from models import Visitor
+from services.approval_cache import approval_cache
+from services.face_descriptors import face_descriptor_store, content_hash, MISS, DESCRIPTOR_BINS, PHOTO_URL_PREFIX
+from services.photo_manager import photo_manager
 
-# Load cascade classifier
-FACE_CASCADE = cv2.CascadeClassifier(
-    cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-)
+CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
 
+# CascadeClassifier is not thread-safe; each face worker thread gets its own
+_thread_local = threading.local()
 
-def detect_faces(image_bytes: bytes) -> dict:
+
+def get_face_cascade() -> cv2.CascadeClassifier:
+    """Cascade classifier for the current thread"""
+    cascade = getattr(_thread_local, "cascade", None)
+    if cascade is None:
+        cascade = _thread_local.cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    return cascade
+
+
+# Haar cascade parameters shared by every detection pass
+SCALE_FACTOR = 1.1
+MIN_NEIGHBORS = 5
+MIN_FACE_SIZE = 60  # In full-resolution pixels
+CASCADE_WINDOW = 24  # Training window of the frontal-face cascade; smallest detectable face
+
+# Verification: faces are resized to this before histogramming
+DESCRIPTOR_FACE_SIZE = (128, 128)
+MATCH_THRESHOLD = 55  # Confidence (%) above which two faces match
+
+# MATCH_THRESHOLD was set against cv2.compareHist(HISTCMP_CORREL) on 3-D
+# histograms, which takes its means over one 2-D plane of bins rather than
+# all of them. Scores keep that formula so match decisions don't move.
+CORREL_MEAN_BINS = DESCRIPTOR_BINS[1] * DESCRIPTOR_BINS[2]
+
+
+class FaceImage:
     """
-    Detect faces in an image.
-    Returns: { detected: bool, count: int, faces: [...], image_path: str }
+    A decoded image with its grayscale frame and face detections.
+    Decode and detection each happen once, however many of annotate / crop /
+    verify are applied to the same upload.
     """
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
-    if image is None:
+    def __init__(self, image: np.ndarray):
+        self.image = image
+        self._gray = None
+        self._faces = None
+
+    @classmethod
+    def decode(cls, image_bytes: bytes) -> "FaceImage | None":
+        """Decode JPEG/PNG bytes; None if the data is not an image"""
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        return cls(image) if image is not None else None
+
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def faces(self) -> list:
+        """Detected face boxes as (x, y, w, h) tuples, in full-resolution coordinates"""
+        if self._faces is None:
+            self._faces = self._detect(settings.face_detect_max_dimension)
+        return self._faces
+
+    def _detect(self, max_dimension: int) -> list:
+        """
+        Run the cascade on the gray frame, downscaled so its longest side is at
+        most `max_dimension`, and map the boxes back to the original frame.
+        """
+        gray = self.gray
+        longest = max(self.width, self.height)
+        scale = max_dimension / longest if 0 < max_dimension < longest else 1.0
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        # Keep the same minimum face size relative to the original frame
+        min_size = max(CASCADE_WINDOW, round(MIN_FACE_SIZE * scale))
+        found = get_face_cascade().detectMultiScale(
+            gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS,
+            minSize=(min_size, min_size)
+        )
+
+        faces = []
+        for (x, y, w, h) in found:
+            x1 = min(self.width, round(x / scale))
+            y1 = min(self.height, round(y / scale))
+            faces.append((
+                x1,
+                y1,
+                min(self.width - x1, round(w / scale)),
+                min(self.height - y1, round(h / scale)),
+            ))
+        return faces
+
+    def largest_face(self) -> tuple | None:
+        if not self.faces:
+            return None
+        return max(self.faces, key=lambda f: f[2] * f[3])
+
+    def detection_result(self) -> dict:
+        """Detection summary in the /api/face/detect response shape"""
+        face_list = []
+        for i, (x, y, w, h) in enumerate(self.faces):
+            face_list.append({
+                "index": i,
+                "x": x,
+                "y": y,
+                "width": w,
+                "height": h,
+                "confidence": round(float(w * h) / (self.height * self.width) * 100, 1),
+            })
+
+        return {
+            "detected": len(face_list) > 0,
+            "count": len(face_list),
+            "faces": face_list,
+            "image_width": self.width,
+            "image_height": self.height,
+        }
+
+    def crop_largest(self, padding: float = 0.2) -> np.ndarray | None:
+        """Largest face with `padding` (fraction of its size) on each side"""
+        face = self.largest_face()
+        if face is None:
+            return None
+
+        x, y, w, h = face
+        pad = int(max(w, h) * padding)
+        x1 = max(0, x - pad)
+        y1 = max(0, y - pad)
+        x2 = min(self.width, x + w + pad)
+        y2 = min(self.height, y + h + pad)
+        return self.image[y1:y2, x1:x2]
+
+    def descriptor(self) -> np.ndarray | None:
+        """
+        L2-normalized color histogram of the largest face, flattened
+        (scored by match_confidences). None if no face was detected.
+        """
+        face = self.crop_largest(padding=0)
+        if face is None:
+            return None
+
+        face = cv2.resize(face, DESCRIPTOR_FACE_SIZE)
+        hist = cv2.calcHist([face], [0, 1, 2], None, list(DESCRIPTOR_BINS), [0, 256, 0, 256, 0, 256])
+        cv2.normalize(hist, hist)
+        return hist.ravel()
+
+    def sharpness(self) -> float:
+        """Variance of the Laplacian over the largest face (0 if none); higher is sharper"""
+        face = self.largest_face()
+        if face is None:
+            return 0.0
+        x, y, w, h = face
+        return float(cv2.Laplacian(self.gray[y:y + h, x:x + w], cv2.CV_64F).var())
+
+    def annotated(self) -> np.ndarray:
+        """Copy of the image with a box drawn around each face"""
+        image = self.image.copy()
+        for (x, y, w, h) in self.faces:
+            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 200, 0), 2)
+            cv2.putText(image, "Face", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 0), 2)
+        return image
+
+
+def _as_face_image(image: "bytes | FaceImage") -> FaceImage | None:
+    return image if isinstance(image, FaceImage) else FaceImage.decode(image)
+
+
+def encode_jpeg(image: np.ndarray) -> bytes:
+    _, buffer = cv2.imencode(".jpg", image)
+    return buffer.tobytes()
+
+
+def detect_faces(image: "bytes | FaceImage") -> dict:
+    """
+    Detect faces in an image.
+    Returns: { detected: bool, count: int, faces: [...], image_width, image_height }
+    """
+    face_image = _as_face_image(image)
+    if face_image is None:
         return {"detected": False, "count": 0, "error": "Invalid image"}
+    return face_image.detection_result()
 
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    faces = FACE_CASCADE.detectMultiScale(
-        gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60)
-    )
 
-    face_list = []
-    for i, (x, y, w, h) in enumerate(faces):
-        face_list.append({
-            "index": i,
-            "x": int(x),
-            "y": int(y),
-            "width": int(w),
-            "height": int(h),
-            "confidence": round(float(w * h) / (image.shape[0] * image.shape[1]) * 100, 1),
-        })
+def detect_and_annotate(image_bytes: bytes) -> tuple[dict, bytes | None]:
+    """Detection result plus the annotated JPEG, from a single decode"""
+    face_image = FaceImage.decode(image_bytes)
+    if face_image is None:
+        return detect_faces(image_bytes), None
+    return face_image.detection_result(), encode_jpeg(face_image.annotated())
 
-    return {
-        "detected": len(faces) > 0,
-        "count": len(faces),
-        "faces": face_list,
-        "image_width": image.shape[1],
-        "image_height": image.shape[0],
-    }
+
+def detect_frame(image_bytes: bytes) -> dict:
+    """Detection result for one frame of a burst, plus largest-face sharpness"""
+    face_image = FaceImage.decode(image_bytes)
+    if face_image is None:
+        return detect_faces(image_bytes)
+    return {**face_image.detection_result(), "sharpness": round(face_image.sharpness(), 1)}
 
 
-def save_visitor_photo(image_bytes: bytes, visitor_id: int) -> str:
+def best_frame_index(frames: list) -> int | None:
     """
-    Save a visitor photo and return the filename.
+    Pick the frame whose largest face is biggest and sharpest. Both are
+    scaled to the best value in the batch so neither dominates.
     """
-    filename = f"visitor_{visitor_id}_{uuid.uuid4().hex[:8]}.jpg"
-    filepath = PHOTOS_DIR / filename
-    with open(filepath, "wb") as f:
-        f.write(image_bytes)
+    scored = [
+        (i, max(f["width"] * f["height"] for f in frame["faces"]), frame["sharpness"])
+        for i, frame in enumerate(frames) if frame.get("detected")
+    ]
+    if not scored:
+        return None
+
+    max_area = max(area for _, area, _ in scored)
+    max_sharpness = max(sharpness for _, _, sharpness in scored) or 1.0
+    return max(scored, key=lambda s: (s[1] / max_area) * (s[2] / max_sharpness))[0]
+
+
+def save_visitor_photo(image_bytes: bytes, visitor_id: int, face_image: "FaceImage | None" = None) -> str:
+    """
+    Save a visitor photo and its face descriptor, point the visitor's
+    photo_url at it, and return the filename.
+    Photos are content-addressed, so a retry or a returning visitor with the
+    same bytes reuses the stored file and descriptor. The photo_url is what
+    verify-identity, identify and photo GC treat as the visitor's photo.
+    Pass `face_image` when the bytes are already decoded.
+    """
+    filename = photo_manager.store_photo(image_bytes)
+    store_photo_descriptor(filename, image_bytes, face_image)
+
+    db = SessionLocal()
+    try:
+        visitor = db.query(Visitor).filter(Visitor.id == visitor_id).first()
+        if visitor is not None:
+            visitor.photo_url = f"{PHOTO_URL_PREFIX}{filename}"
+            db.commit()
+    finally:
+        db.close()
+    # Cached gate-check snapshots and the identify index carry photo_url
+    approval_cache.invalidate()
     return filename
 
 
-def crop_face(image_bytes: bytes) -> bytes | None:
+def capture_visitor_photo(image_bytes: bytes, visitor_id: int) -> tuple[dict, str | None]:
     """
-    Detect and crop the largest face from an image. Returns cropped face JPEG bytes.
+    Detect faces and, if there is one, save the photo and its descriptor.
+    Returns the detection result and the saved filename (None if no face).
     """
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if image is None:
-        return None
+    face_image = FaceImage.decode(image_bytes)
+    if face_image is None:
+        return detect_faces(image_bytes), None
 
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    faces = FACE_CASCADE.detectMultiScale(
-        gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60)
-    )
+    detection = face_image.detection_result()
+    if not detection["detected"]:
+        return detection, None
+    return detection, save_visitor_photo(image_bytes, visitor_id, face_image)
+
+
+# ============== Descriptor store ==============
 
-    if len(faces) == 0:
+def store_photo_descriptor(filename: str, image_bytes: bytes, face_image: "FaceImage | None" = None):
+    """Compute (or reuse, for identical bytes) and persist the descriptor of a stored photo"""
+    photo_hash = content_hash(image_bytes)
+    if face_descriptor_store.get_hash(filename) == photo_hash:
+        return
+
+    descriptor = face_descriptor_store.find_by_hash(photo_hash)
+    if descriptor is MISS:
+        face_image = face_image or FaceImage.decode(image_bytes)
+        descriptor = face_image.descriptor() if face_image is not None else None
+    face_descriptor_store.put(filename, photo_hash, descriptor)
+
+
+def reference_descriptor(filename: str) -> np.ndarray | None:
+    """
+    Descriptor of a stored photo, computed and persisted on first use for
+    photos saved before the store existed. None if missing or faceless.
+    """
+    descriptor = face_descriptor_store.get(filename)
+    if descriptor is not MISS:
+        return descriptor
+
+    filepath = photo_manager.photo_path(filename)
+    if filepath is None:
         return None
+    store_photo_descriptor(filename, filepath.read_bytes())
+    return face_descriptor_store.get(filename)
 
-    # Take the largest face
-    faces_sorted = sorted(faces, key=lambda f: f[2] * f[3], reverse=True)
-    x, y, w, h = faces_sorted[0]
 
-    # Add padding
-    pad = int(max(w, h) * 0.2)
-    x1 = max(0, x - pad)
-    y1 = max(0, y - pad)
-    x2 = min(image.shape[1], x + w + pad)
-    y2 = min(image.shape[0], y + h + pad)
+def crop_face(image: "bytes | FaceImage") -> bytes | None:
+    """
+    Detect and crop the largest face from an image. Returns cropped face JPEG bytes.
+    """
+    face_image = _as_face_image(image)
+    if face_image is None:
+        return None
 
-    cropped = image[y1:y2, x1:x2]
-    _, buffer = cv2.imencode(".jpg", cropped)
-    return buffer.tobytes()
+    cropped = face_image.crop_largest()
+    return encode_jpeg(cropped) if cropped is not None else None
 
 
-def verify_faces(image1_bytes: bytes, image2_bytes: bytes) -> dict:
+def verify_faces(image1: "bytes | FaceImage", image2: "bytes | FaceImage") -> dict:
     """
     Compare two face images using histogram correlation.
     Returns: { match: bool, confidence: float, message: str }
     """
-    img1 = cv2.imdecode(np.frombuffer(image1_bytes, np.uint8), cv2.IMREAD_COLOR)
-    img2 = cv2.imdecode(np.frombuffer(image2_bytes, np.uint8), cv2.IMREAD_COLOR)
+    face_image1 = _as_face_image(image1)
+    face_image2 = _as_face_image(image2)
 
-    if img1 is None or img2 is None:
+    if face_image1 is None or face_image2 is None:
         return {"match": False, "confidence": 0, "message": "Invalid image(s)"}
 
-    # Detect faces in both
-    gray1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-    gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-
-    faces1 = FACE_CASCADE.detectMultiScale(gray1, 1.1, 5, minSize=(60, 60))
-    faces2 = FACE_CASCADE.detectMultiScale(gray2, 1.1, 5, minSize=(60, 60))
+    descriptor1 = face_image1.descriptor()
+    descriptor2 = face_image2.descriptor()
 
-    if len(faces1) == 0:
+    if descriptor1 is None:
         return {"match": False, "confidence": 0, "message": "No face detected in first image"}
-    if len(faces2) == 0:
+    if descriptor2 is None:
         return {"match": False, "confidence": 0, "message": "No face detected in second image"}
 
-    # Crop the largest face from each
-    x1, y1, w1, h1 = sorted(faces1, key=lambda f: f[2] * f[3], reverse=True)[0]
-    x2, y2, w2, h2 = sorted(faces2, key=lambda f: f[2] * f[3], reverse=True)[0]
+    return _verification_result(match_confidences(descriptor1, descriptor2[np.newaxis])[0])
 
-    face1 = img1[y1:y1 + h1, x1:x1 + w1]
-    face2 = img2[y2:y2 + h2, x2:x2 + w2]
 
-    # Resize both faces to the same size
-    target_size = (128, 128)
-    face1 = cv2.resize(face1, target_size)
-    face2 = cv2.resize(face2, target_size)
+def verify_against_photo(image_bytes: bytes, filename: str) -> dict:
+    """
+    Compare a live capture with a stored photo using its precomputed descriptor.
+    Only the live capture is decoded and detected.
+    """
+    reference = reference_descriptor(filename)
+    if reference is None:
+        return {"match": False, "confidence": 0, "message": "No face in stored photo"}
+
+    face_image = FaceImage.decode(image_bytes)
+    if face_image is None:
+        return {"match": False, "confidence": 0, "message": "Invalid image"}
 
-    # Compare using histogram correlation
-    hist1 = cv2.calcHist([face1], [0, 1, 2], None, [32, 32, 32], [0, 256, 0, 256, 0, 256])
-    hist2 = cv2.calcHist([face2], [0, 1, 2], None, [32, 32, 32], [0, 256, 0, 256, 0, 256])
+    probe = face_image.descriptor()
+    if probe is None:
+        return {"match": False, "confidence": 0, "message": "No face detected in live capture"}
 
-    cv2.normalize(hist1, hist1)
-    cv2.normalize(hist2, hist2)
+    return _verification_result(match_confidences(probe, reference[np.newaxis])[0])
 
-    correlation = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
-    confidence = round(max(0, correlation) * 100, 1)
+
+def descriptor_sums(references: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row sum and sum of squares, reusable across match_confidences calls"""
+    return (
+        references.sum(axis=1, dtype=np.float64),
+        np.einsum("ij,ij->i", references, references).astype(np.float64),
+    )
+
+
+def match_confidences(
+    probe: np.ndarray,
+    references: np.ndarray,
+    sums: "tuple[np.ndarray, np.ndarray] | None" = None,
+) -> np.ndarray:
+    """
+    Confidence (%) of `probe` against every row of `references`, as
+    cv2.compareHist(HISTCMP_CORREL) scores the 3-D histograms (see
+    CORREL_MEAN_BINS), from one matrix-vector product. Pass `sums` from
+    descriptor_sums() when scoring many probes against the same rows.
+    """
+    scale = 1.0 / CORREL_MEAN_BINS
+    s1, s11 = sums if sums is not None else descriptor_sums(references)
+    s2 = float(probe.sum(dtype=np.float64))
+    s22 = float(probe @ probe)
+
+    numerator = (references @ probe).astype(np.float64) - s1 * s2 * scale
+    denominator = (s11 - s1 * s1 * scale) * (s22 - s2 * s2 * scale)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(np.abs(denominator) > np.finfo(np.float64).eps, numerator / np.sqrt(denominator), 1.0)
+    # A negative denominator gives NaN in compareHist, which max(0, nan) turned into 0
+    scores = np.nan_to_num(scores, nan=0.0)
+    return np.round(np.clip(scores, 0, None) * 100, 1)
+
+
+def _verification_result(confidence: float) -> dict:
+    confidence = float(confidence)
 
     # Threshold for match
-    match = confidence > 55
+    match = confidence > MATCH_THRESHOLD
 
     if match:
         message = f"Faces match with {confidence}% confidence"
@@ -158,21 +414,11 @@ def verify_faces(image1_bytes: bytes, image2_bytes: bytes) -> dict:
     }
 
 
-def draw_face_boxes(image_bytes: bytes) -> bytes | None:
+def draw_face_boxes(image: "bytes | FaceImage") -> bytes | None:
     """
     Draw bounding boxes on detected faces and return the annotated image bytes.
     """
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if image is None:
+    face_image = _as_face_image(image)
+    if face_image is None:
         return None
-
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    faces = FACE_CASCADE.detectMultiScale(gray, 1.1, 5, minSize=(60, 60))
-
-    for (x, y, w, h) in faces:
-        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 200, 0), 2)
-        cv2.putText(image, "Face", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 0), 2)
-
-    _, buffer = cv2.imencode(".jpg", image)
-    return buffer.tobytes()
+    return encode_jpeg(face_image.annotated())
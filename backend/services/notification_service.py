@@ -1,25 +1,153 @@
 """
-Notification service: Push notifications, SMS, Email
+Notification service: in-process pub/sub hub for approval events
+Approval state changes are published here and streamed to residents and
+gates over Server-Sent Events (see api/events.py). Recent events are kept
+in a ring buffer so reconnecting clients can replay from Last-Event-ID.
 """
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from core import settings, logger
+
+GATE_TOPIC = "gate"
+
+
+def resident_topic(resident_id: int) -> str:
+    return f"resident:{resident_id}"
+
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: dict
+    topics: tuple
+
+
+@dataclass
+class Subscription:
+    """One connected client. `queue` yields Events, or None once it overflowed."""
+    topic: str
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    replay: List[Event] = field(default_factory=list)
+    resync: bool = False  # Last-Event-ID too old to replay; client must refetch state
 
 
 class NotificationService:
-    """Send notifications to residents and guards"""
+    """Publish approval events and fan them out to SSE subscribers"""
 
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        history_size: int = settings.events_history_size,
+        queue_size: int = settings.events_queue_size,
+    ):
+        self._lock = threading.Lock()
+        self._history: Deque[Event] = deque(maxlen=history_size)
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._queue_size = queue_size
+        # Time-based ids stay increasing across restarts, so stale ids trigger a resync
+        self._next_id = int(time.time() * 1000)
 
-    def send_approval_request(self, resident_id: int, visitor_name: str):
-        """Send approval request notification to resident"""
-        pass
+    # ============== Publishing ==============
 
-    def send_approval_confirmation(self, resident_id: int, visitor_name: str):
-        """Send approval confirmation notification"""
-        pass
+    def publish(self, event_type: str, data: dict, resident_id: Optional[int] = None) -> Event:
+        """
+        Publish an event to the gate topic and, if given, the resident's topic.
+        Safe to call from sync endpoints running on the threadpool.
+        """
+        topics = (GATE_TOPIC, resident_topic(resident_id)) if resident_id else (GATE_TOPIC,)
 
-    def send_check_in_alert(self, resident_id: int, visitor_name: str):
-        """Send check-in alert to resident"""
-        pass
+        with self._lock:
+            event = Event(id=self._next_id, type=event_type, data=jsonable_encoder(data), topics=topics)
+            self._next_id += 1
+            self._history.append(event)
+            targets = [s for topic in topics for s in self._subscribers.get(topic, [])]
+
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(self._deliver, subscription, event)
+            except RuntimeError:
+                pass  # Subscriber's loop already closed
+
+        return event
+
+    def publish_approval(self, event_type: str, approval, visitor=None, resident=None) -> Event:
+        """Publish an approval state change (requested, approved, denied, checked_in)"""
+        return self.publish(
+            event_type,
+            {
+                "approval_id": approval.id,
+                "visitor_id": approval.visitor_id,
+                "resident_id": approval.resident_id,
+                "status": approval.status,
+                "approval_method": approval.approval_method,
+                "valid_from": approval.valid_from,
+                "valid_until": approval.valid_until,
+                "visitor_name": visitor.name if visitor else None,
+                "purpose": visitor.purpose if visitor else None,
+                "photo_url": visitor.photo_url if visitor else None,
+                "apt_number": resident.apt_number if resident else None,
+            },
+            resident_id=approval.resident_id,
+        )
+
+    def _deliver(self, subscription: Subscription, event: Event):
+        """Runs on the subscriber's event loop"""
+        if subscription.queue.full():
+            # Backpressure: drop the slow client; it reconnects and replays from Last-Event-ID
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(None)
+            logger.warning("event_subscriber_overflow", topic=subscription.topic, event_id=event.id)
+            return
+        subscription.queue.put_nowait(event)
+
+    # ============== Subscribing ==============
+
+    @contextmanager
+    def subscribe(self, topic: str, last_event_id: Optional[int] = None) -> Iterator[Subscription]:
+        """
+        Register a subscriber on the running event loop.
+        Events after `last_event_id` still in history are placed in `replay`.
+        """
+        subscription = Subscription(
+            topic=topic,
+            loop=asyncio.get_running_loop(),
+            queue=asyncio.Queue(maxsize=self._queue_size),
+        )
+
+        with self._lock:
+            if last_event_id is not None:
+                oldest = self._history[0].id if self._history else self._next_id
+                if last_event_id < oldest - 1 or last_event_id >= self._next_id:
+                    subscription.resync = True
+                else:
+                    subscription.replay = [
+                        e for e in self._history if e.id > last_event_id and topic in e.topics
+                    ]
+            self._subscribers.setdefault(topic, []).append(subscription)
+
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscribers[topic].remove(subscription)
+                if not self._subscribers[topic]:
+                    del self._subscribers[topic]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    # ============== External channels ==============
 
     def send_sms(self, phone_number: str, message: str):
         """Send SMS notification"""
@@ -28,3 +156,6 @@ class NotificationService:
     def send_push_notification(self, user_id: int, message: str):
         """Send push notification"""
         pass
+
+
+notification_service = NotificationService()
@@ -1,13 +1,124 @@
 """
 Photo upload and storage management
+Uploads are stored content-addressed: one file per SHA-256, sharded by hash
+prefix (photos/ab/cd/abcd...jpg) and served as /api/photos/<sha256>.jpg, so
+re-uploads of identical bytes share a file. Each blob has a photo_blobs row;
+blobs no photo_url points to are removed by collect_unreferenced_photos().
+Files saved before this scheme keep their flat names and are still served.
+Uploads are streamed to a temp file in chunks (never fully buffered) and
+renamed into place once complete.
+
+Resized variants (guard-list avatars, thumbnails) are generated on first
+request and cached on disk under data/photo_variants. The cache is capped
+at PHOTO_VARIANT_CACHE_MB; least-recently-served variants are evicted first.
+Stored photos never change once written, so they are served with strong
+content-hash ETags and long-lived immutable caching.
 """
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+import aiofiles.os
+import cv2
+from sqlalchemy import delete, exists, or_
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from core import settings, logger
+from database import SessionLocal
+from models import PhotoBlob, Visitor, Resident, RecurringVisitor, FaceDescriptor
+
+VARIANT_JPEG_QUALITY = 85
+
+PHOTO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+PHOTO_EXTENSION = ".jpg"
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_BYTES = settings.photo_max_upload_mb * 1024 * 1024
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})\.jpg$")
+
+# Bound on remembered (path -> ETag) entries
+MAX_CACHED_ETAGS = 20000
+
+# libjpeg can decode directly at 1/8, 1/4 or 1/2 scale, which is far cheaper
+# than decoding a 12 MP photo and shrinking it
+REDUCED_READS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+    (1, cv2.IMREAD_COLOR),
+)
+
+
+class PhotoTooLarge(Exception):
+    """Raised when an upload exceeds the size limit"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Photo exceeds {max_bytes // (1024 * 1024)} MB limit")
+        self.max_bytes = max_bytes
+
+
+async def read_upload(upload, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Read an UploadFile in chunks, stopping as soon as it exceeds `max_bytes`.
+    For uploads that must be decoded in memory anyway (face detection).
+
+    Raises:
+        PhotoTooLarge: if the upload is over the limit
+    """
+    chunks = []
+    size = 0
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise PhotoTooLarge(max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def safe_photo_name(filename: str) -> bool:
+    """True if `filename` is a bare file name (no directories or dotfiles)"""
+    return bool(filename) and "/" not in filename and "\\" not in filename and not filename.startswith(".")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for this header)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
 
 
 class PhotoManager:
     """Manage visitor photo uploads and storage"""
 
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        photos_dir: Path = None,
+        variants_dir: Path = None,
+        variant_cache_bytes: int = settings.photo_variant_cache_mb * 1024 * 1024,
+    ):
+        self.photos_dir = photos_dir or settings.photos_dir
+        self.variants_dir = variants_dir or settings.photo_variants_dir
+        self.variant_widths = settings.get_photo_variant_widths()
+        self._variant_cache_bytes = variant_cache_bytes
+        self._lock = threading.Lock()
+        # variant path -> size in bytes, least recently served first
+        self._variants: Optional["OrderedDict[Path, int]"] = None
+        self._variants_size = 0
+        # path -> (mtime_ns, size, etag); hashed once per file version
+        self._etags: "OrderedDict[Path, tuple]" = OrderedDict()
+        # Placing a blob file + recording its row vs. GC deleting the row + file
+        self._blob_lock = threading.Lock()
 
     def upload_photo(self, visitor_id: int, photo_file) -> str:
         """Upload and store visitor photo"""
@@ -21,6 +132,283 @@ class PhotoManager:
         """Delete visitor photo"""
         pass
 
-    def resize_photo(self, photo_path: str, width: int, height: int):
-        """Resize photo to specified dimensions"""
-        pass
+    # ============== Content-addressed storage ==============
+
+    def blob_path(self, content_hash: str) -> Path:
+        """Sharded location of a blob: photos/ab/cd/<hash>.jpg"""
+        return self.photos_dir / content_hash[:2] / content_hash[2:4] / f"{content_hash}{PHOTO_EXTENSION}"
+
+    def photo_path(self, filename: str) -> Optional[Path]:
+        """Path of a stored photo, or None if it does not exist"""
+        if not safe_photo_name(filename):
+            return None
+        match = CONTENT_ADDRESSED_NAME.match(filename)
+        path = self.blob_path(match.group(1)) if match else self.photos_dir / filename
+        return path if path.is_file() else None
+
+    def store_photo(self, data: bytes) -> str:
+        """
+        Store photo bytes and return the filename to use in /api/photos/<filename>.
+        Identical bytes are stored once.
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(content_hash)
+        with self._blob_lock:
+            if not path.is_file():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            self._record_blob(content_hash, len(data))
+        return f"{content_hash}{PHOTO_EXTENSION}"
+
+    async def store_upload(self, upload, max_bytes: int = MAX_UPLOAD_BYTES) -> Optional[str]:
+        """
+        Stream an UploadFile into the store without buffering it in memory.
+        Chunks go to a temp file through aiofiles while being hashed; the file is
+        renamed to its content address once complete. Returns the filename, or
+        None for an empty upload.
+
+        Raises:
+            PhotoTooLarge: as soon as the upload exceeds `max_bytes`
+        """
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = self.photos_dir / f".upload.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise PhotoTooLarge(max_bytes)
+                    digest.update(chunk)
+                    await f.write(chunk)
+            if size == 0:
+                return None
+
+            content_hash = digest.hexdigest()
+            await run_in_threadpool(self._place_blob, tmp_path, content_hash, size)
+        finally:
+            try:
+                await aiofiles.os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+
+        return f"{content_hash}{PHOTO_EXTENSION}"
+
+    def _place_blob(self, tmp_path: Path, content_hash: str, size: int):
+        """Move a completed upload to its content address and record it, atomically with respect to GC"""
+        path = self.blob_path(content_hash)
+        with self._blob_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Atomic; if the blob already exists it is replaced by identical bytes
+            os.replace(tmp_path, path)
+            self._record_blob(content_hash, size)
+
+    def _record_blob(self, content_hash: str, size: int):
+        """Upsert the blob row; stored_at restarts the GC grace period"""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            blob = db.get(PhotoBlob, content_hash)
+            if blob is None:
+                db.add(PhotoBlob(content_hash=content_hash, size=size, created_at=now, stored_at=now))
+            else:
+                blob.stored_at = now
+            db.commit()
+        except IntegrityError:
+            # Same bytes recorded concurrently; refresh its stored_at instead
+            db.rollback()
+            db.query(PhotoBlob).filter(PhotoBlob.content_hash == content_hash).update({"stored_at": now})
+            db.commit()
+        finally:
+            db.close()
+
+    def collect_unreferenced_photos(self, grace_hours: int = settings.photo_gc_grace_hours) -> int:
+        """
+        Delete blobs that no Visitor / Resident / RecurringVisitor photo_url
+        references and that were last stored more than `grace_hours` ago (so a
+        fresh capture is not collected before the visitor record points at it).
+        Both conditions are re-checked in the DELETE itself, and the file is
+        only removed when that DELETE took the row, so a blob re-stored or
+        newly referenced since the candidates were listed survives.
+        Returns the number of blobs removed.
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+        removed = 0
+        freed = 0
+        db = SessionLocal()
+        try:
+            candidates = db.query(PhotoBlob.content_hash, PhotoBlob.size).filter(PhotoBlob.stored_at < cutoff).all()
+            for content_hash, size in candidates:
+                filename = f"{content_hash}{PHOTO_EXTENSION}"
+                unreferenced = [
+                    ~exists().where(or_(model.photo_url == filename, model.photo_url.like(f"%/{filename}")))
+                    for model in (Visitor, Resident, RecurringVisitor)
+                ]
+                with self._blob_lock:
+                    deleted = db.execute(
+                        delete(PhotoBlob).where(
+                            PhotoBlob.content_hash == content_hash,
+                            PhotoBlob.stored_at < cutoff,
+                            *unreferenced,
+                        )
+                    ).rowcount
+                    if deleted:
+                        db.query(FaceDescriptor).filter(FaceDescriptor.photo_filename == filename).delete()
+                    db.commit()
+                    if deleted:
+                        self.blob_path(content_hash).unlink(missing_ok=True)
+                        removed += 1
+                        freed += size
+        finally:
+            db.close()
+
+        logger.info("photo_gc_completed", removed=removed, freed_bytes=freed, kept=len(candidates) - removed)
+        return removed
+
+    def resize_photo(self, photo_path: str, width: int, height: int = None) -> Optional[bytes]:
+        """
+        Resize photo to specified dimensions and return JPEG bytes.
+        Without `height` the aspect ratio is kept; images are never upscaled.
+        """
+        preview = cv2.imread(str(photo_path), cv2.IMREAD_REDUCED_COLOR_8)
+        if preview is None:
+            return None
+
+        # Largest decode-time reduction that still leaves at least `width` pixels
+        full_width = preview.shape[1] * 8
+        for reduction, flag in REDUCED_READS:
+            if full_width // reduction >= width or reduction == 1:
+                image = preview if reduction == 8 else cv2.imread(str(photo_path), flag)
+                break
+        if image is None:
+            return None
+
+        src_height, src_width = image.shape[:2]
+        if height is None:
+            height = round(src_height * width / src_width)
+        if width < src_width:
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, VARIANT_JPEG_QUALITY])
+        return buffer.tobytes() if ok else None
+
+    def content_etag(self, path: Path) -> str:
+        """Strong ETag (SHA-256 of the file contents), cached until the file changes"""
+        match = CONTENT_ADDRESSED_NAME.match(path.name)
+        if match:
+            return f'"{match.group(1)}"'
+
+        stat = path.stat()
+        with self._lock:
+            cached = self._etags.get(path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                self._etags.move_to_end(path)
+                return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+
+        with self._lock:
+            self._etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+            self._etags.move_to_end(path)
+            while len(self._etags) > MAX_CACHED_ETAGS:
+                self._etags.popitem(last=False)
+        return etag
+
+    def resolve(self, filename: str, width: Optional[int] = None) -> Optional[tuple]:
+        """
+        (path, etag) of a stored photo or, with `width`, of its resized variant.
+        A variant's ETag is its source's plus the width ("<sha256>-w128"), so
+        cache hits never rehash the variant file.
+        None if the photo does not exist. Blocking; run it in a thread.
+        """
+        source = self.photo_path(filename)
+        if source is None:
+            return None
+        if width is None:
+            return source, self.content_etag(source)
+
+        width = self.variant_width(width)
+        variant = self.get_variant(filename, width)
+        if variant is None:
+            return None
+        source_etag = self.content_etag(source)  # '"<sha256>"'
+        return variant, f'{source_etag[:-1]}-w{width}"'
+
+    # ============== Variant cache ==============
+
+    def variant_width(self, requested: int) -> int:
+        """Round a requested width up to the nearest configured variant width"""
+        for width in self.variant_widths:
+            if width >= requested:
+                return width
+        return self.variant_widths[-1]
+
+    def get_variant(self, filename: str, width: int) -> Optional[Path]:
+        """
+        Path of the cached `width`-pixel variant of a stored photo, generating
+        it on first use. None if the photo does not exist or cannot be decoded.
+        """
+        source = self.photo_path(filename)
+        if source is None:
+            return None
+
+        width = self.variant_width(width)
+        # Full name, not the stem: legacy flat files "a.jpg" and "a.png" are different photos
+        variant = self.variants_dir / f"{filename}_w{width}.jpg"
+
+        with self._lock:
+            self._load_variant_index()
+            if variant in self._variants:
+                self._variants.move_to_end(variant)
+                try:
+                    os.utime(variant)  # mtime records last use, so LRU order survives restarts
+                    return variant
+                except FileNotFoundError:
+                    self._variants_size -= self._variants.pop(variant)
+
+        data = self.resize_photo(str(source), width)
+        if data is None:
+            return None
+
+        # Write to a temp file and rename, so a concurrent reader never sees a partial file
+        tmp_path = variant.with_name(f".{variant.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, variant)
+
+        with self._lock:
+            self._variants_size += len(data) - self._variants.pop(variant, 0)
+            self._variants[variant] = len(data)
+            self._evict_variants()
+        return variant
+
+    def _load_variant_index(self):
+        """Index variants already on disk, least recently used first (caller holds the lock)"""
+        if self._variants is not None:
+            return
+        entries = []
+        for path in self.variants_dir.glob("*.jpg"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        self._variants = OrderedDict((path, size) for _, path, size in entries)
+        self._variants_size = sum(size for _, _, size in entries)
+
+    def _evict_variants(self):
+        """Drop least-recently-served variants until under the cap (caller holds the lock)"""
+        evicted = 0
+        while self._variants_size > self._variant_cache_bytes and len(self._variants) > 1:
+            path, size = self._variants.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self._variants_size -= size
+            evicted += 1
+        if evicted:
+            logger.info("photo_variants_evicted", count=evicted, cache_bytes=self._variants_size)
+
+
+photo_manager = PhotoManager()
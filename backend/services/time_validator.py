@@ -6,6 +6,7 @@ from typing import Optional, Tuple
 from sqlalchemy.orm import Session
 
 from models import Approval
+from services.approval_cache import approval_cache
 from core import settings
 
 DEFAULT_APPROVAL_DURATION = settings.default_approval_duration
@@ -84,6 +85,7 @@ def check_and_expire_approvals(db: Session) -> int:
     ).update({"status": "expired"})
     
     db.commit()
+    approval_cache.invalidate()
     return expired_count
 
 
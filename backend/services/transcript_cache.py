@@ -0,0 +1,144 @@
+"""
+Transcript cache
+Successful transcriptions keyed by SHA-256 of the uploaded audio bytes plus
+the language hint and Whisper model, so a retried upload or a resubmitted
+clip skips decoding and inference. A bounded in-memory LRU sits in front of
+one small JSON file per entry under data/transcripts; the directory is
+pruned to TRANSCRIPT_CACHE_DISK_ENTRIES, oldest first.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from core import settings, logger, metrics
+
+# Prune the on-disk cache after this many writes
+PRUNE_EVERY = 100
+
+# Returned by get() when nothing is cached for the key
+MISS = object()
+
+
+def transcript_key(audio_bytes: bytes, language: Optional[str], model_name: str) -> str:
+    """Cache key for one upload transcribed with a given language hint and model"""
+    digest = hashlib.sha256(audio_bytes)
+    digest.update(f"\0{language or ''}\0{model_name}".encode())
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """In-memory LRU over JSON transcript files"""
+
+    def __init__(
+        self,
+        max_cached: int = settings.transcript_cache_size,
+        max_disk_entries: int = settings.transcript_cache_disk_entries,
+    ):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._max_cached = max_cached
+        self._max_disk_entries = max_disk_entries
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return settings.transcripts_dir / f"{key}.json"
+
+    def _remember(self, key: str, transcription: dict):
+        with self._lock:
+            self._cache[key] = transcription
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.increment("transcript_cache_hits" if hit else "transcript_cache_misses")
+
+    def get(self, key: str):
+        """Cached transcription for `key`, or MISS"""
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        if cached is not None:
+            self._count(True)
+            return dict(cached)
+
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                transcription = json.load(f)
+            os.utime(path)  # Mark as recently used for pruning
+        except (OSError, ValueError):
+            self._count(False)
+            return MISS
+
+        self._remember(key, transcription)
+        self._count(True)
+        return dict(transcription)
+
+    def put(self, key: str, transcription: dict):
+        """Store a successful transcription in memory and on disk"""
+        self._remember(key, transcription)
+
+        path = self._path(key)
+        tmp_path = path.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(transcription, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("transcript_cache_write_failed", error=str(e))
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        """Drop the least recently used files beyond TRANSCRIPT_CACHE_DISK_ENTRIES"""
+        entries = []
+        for entry in os.scandir(settings.transcripts_dir):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+        excess = len(entries) - self._max_disk_entries
+        if excess <= 0:
+            return
+        entries.sort()
+        for _, path in entries[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        logger.info("transcript_cache_pruned", removed=excess)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses, entries = self.hits, self.misses, len(self._cache)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "memory_entries": entries,
+        }
+
+
+transcript_cache = TranscriptCache()
@@ -0,0 +1,71 @@
+"""
+Visitor lookup queries shared by the guard and visitor endpoints
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from models import Approval, Resident, Visitor
+from services.visitor_search import DEFAULT_SEARCH_LIMIT, search_visitor_ids
+
+
+def find_visitors_with_latest_approval(
+    db: Session,
+    *criteria
+) -> List[Tuple[Visitor, Optional[Approval], Optional[Resident]]]:
+    """
+    Find visitors matching `criteria` together with each visitor's most
+    recent approval and that approval's resident, in a single statement.
+
+    The latest approval is picked with ROW_NUMBER() partitioned by visitor,
+    which walks the (visitor_id, created_at) index on approvals.
+
+    Returns:
+        [(visitor, approval or None, resident or None), ...] ordered by visitor id
+    """
+    matching_ids = select(Visitor.id).where(*criteria)
+
+    ranked = (
+        select(
+            Approval.id.label("approval_id"),
+            Approval.visitor_id.label("visitor_id"),
+            func.row_number().over(
+                partition_by=Approval.visitor_id,
+                order_by=(Approval.created_at.desc(), Approval.id.desc())
+            ).label("rank")
+        )
+        .where(Approval.visitor_id.in_(matching_ids))
+        .subquery()
+    )
+
+    rows = (
+        db.query(Visitor, Approval, Resident)
+        .outerjoin(ranked, and_(ranked.c.visitor_id == Visitor.id, ranked.c.rank == 1))
+        .outerjoin(Approval, Approval.id == ranked.c.approval_id)
+        .outerjoin(Resident, Resident.id == Approval.resident_id)
+        .filter(*criteria)
+        .order_by(Visitor.id)
+        .all()
+    )
+    return [tuple(row) for row in rows]
+
+
+def search_visitors_with_latest_approval(
+    db: Session,
+    query: str,
+    fields: Sequence[str] = ("name", "phone"),
+    limit: int = DEFAULT_SEARCH_LIMIT
+) -> List[Tuple[Visitor, Optional[Approval], Optional[Resident]]]:
+    """
+    Ranked visitor search (see services.visitor_search) joined with each
+    match's latest approval and resident. Results keep the search ranking.
+    """
+    visitor_ids = search_visitor_ids(db, query, fields, limit)
+    if not visitor_ids:
+        return []
+
+    position = {visitor_id: i for i, visitor_id in enumerate(visitor_ids)}
+    rows = find_visitors_with_latest_approval(db, Visitor.id.in_(visitor_ids))
+    rows.sort(key=lambda row: position[row[0].id])
+    return rows
@@ -0,0 +1,214 @@
+"""
+Visitor name/phone search index
+SQLite: FTS5 trigram table kept in sync with `visitors` by triggers.
+PostgreSQL: pg_trgm GIN indexes on visitors.name, phone and phone_e164.
+Both support substring matching without scanning the visitors table. Phone
+queries also match the normalized phone_e164 by digits, so "9876543" finds
+a visitor stored as "050-987-6543".
+"""
+from typing import List, Sequence
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from core import logger
+from models import Visitor
+from utils.phone import normalize_phone, phone_search_digits
+
+FTS_TABLE = "visitors_fts"
+
+# Trigram indexes cannot answer queries shorter than one trigram
+MIN_INDEXED_QUERY_LENGTH = 3
+
+DEFAULT_SEARCH_LIMIT = 50
+
+SQLITE_SEARCH_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, phone, phone_e164,
+        content='visitors', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON visitors BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, phone, phone_e164)
+        VALUES (new.id, new.name, new.phone, new.phone_e164);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON visitors BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, phone, phone_e164)
+        VALUES ('delete', old.id, old.name, old.phone, old.phone_e164);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, phone, phone_e164 ON visitors BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, phone, phone_e164)
+        VALUES ('delete', old.id, old.name, old.phone, old.phone_e164);
+        INSERT INTO {FTS_TABLE}(rowid, name, phone, phone_e164)
+        VALUES (new.id, new.name, new.phone, new.phone_e164);
+    END
+    """,
+]
+
+# Dropped before the index is recreated with different columns (migration 0003)
+SQLITE_SEARCH_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_visitors_name_trgm ON visitors USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_visitors_phone_trgm ON visitors USING gin (phone gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_visitors_phone_e164_trgm ON visitors USING gin (phone_e164 gin_trgm_ops)",
+]
+
+# Set by setup_search_index(); False means plain ILIKE scans
+_index_enabled = False
+
+
+def setup_search_index(engine: Engine) -> bool:
+    """
+    Create the search index for the current dialect if missing.
+    A freshly created SQLite index is backfilled from existing visitors.
+    """
+    global _index_enabled
+    dialect = engine.dialect.name
+
+    try:
+        if dialect == "sqlite":
+            with engine.begin() as conn:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE}
+                ).first()
+                for statement in SQLITE_SEARCH_DDL:
+                    conn.execute(text(statement))
+            if not exists:
+                rebuild_search_index(engine)
+        elif dialect == "postgresql":
+            with engine.begin() as conn:
+                for statement in POSTGRES_SEARCH_DDL:
+                    conn.execute(text(statement))
+        else:
+            logger.warning("visitor_search_index_unsupported", dialect=dialect)
+            _index_enabled = False
+            return False
+    except Exception as e:
+        logger.warning("visitor_search_index_unavailable", dialect=dialect, error=str(e))
+        _index_enabled = False
+        return False
+
+    _index_enabled = True
+    logger.info("visitor_search_index_ready", dialect=dialect)
+    return True
+
+
+def rebuild_search_index(engine: Engine) -> int:
+    """
+    Backfill the search index from the visitors table.
+    Only SQLite keeps a separate index table; PostgreSQL indexes are maintained by the database.
+
+    Returns:
+        Number of visitors indexed
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        count = conn.execute(text("SELECT COUNT(*) FROM visitors")).scalar()
+
+    logger.info("visitor_search_index_rebuilt", visitors=count)
+    return count
+
+
+def _fts_phrase(query: str, fields: Sequence[str]) -> str:
+    """Build an FTS5 column-filtered phrase query matching `query` as a substring."""
+    phrase = '"' + query.replace('"', '""') + '"'
+    return "{" + " ".join(fields) + "} : " + phrase
+
+
+def search_visitor_ids(
+    db: Session,
+    query: str,
+    fields: Sequence[str] = ("name", "phone"),
+    limit: int = DEFAULT_SEARCH_LIMIT
+) -> List[int]:
+    """
+    Find visitor ids whose `fields` contain `query`, best matches first.
+    A complete phone number is looked up by its E.164 form; a partial one
+    also matches the digits of phone_e164. Prefix matches rank above other substring matches, with ties broken by
+    bm25 (SQLite) or trigram similarity (PostgreSQL).
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    # Complete phone numbers are an exact lookup on the normalized phone index
+    if "phone" in fields:
+        phone_e164 = normalize_phone(query)
+        if phone_e164:
+            visitor_ids = list(db.execute(
+                select(Visitor.id)
+                .where(Visitor.phone_e164 == phone_e164)
+                .order_by(Visitor.id.desc())
+                .limit(limit)
+            ).scalars())
+            if visitor_ids:
+                return visitor_ids
+
+    # Phone-like queries also match phone_e164 by digits, whatever the stored formatting
+    digits = phone_search_digits(query) if "phone" in fields else None
+
+    dialect = db.get_bind().dialect.name
+    columns = [getattr(Visitor, field) for field in fields]
+    matches = [column.ilike(f"%{query}%") for column in columns]
+    if digits:
+        matches.append(Visitor.phone_e164.like(f"%{digits}%"))
+
+    if _index_enabled and len(query) >= MIN_INDEXED_QUERY_LENGTH:
+        if dialect == "sqlite":
+            match = _fts_phrase(query, fields)
+            if digits and len(digits) >= MIN_INDEXED_QUERY_LENGTH:
+                match += " OR " + _fts_phrase(digits, ["phone_e164"])
+            is_prefix = " OR ".join(f"{field} LIKE :prefix" for field in fields)
+            rows = db.execute(
+                text(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+                    f"ORDER BY ({is_prefix}) DESC, rank LIMIT :limit"
+                ),
+                {"match": match, "prefix": f"{query}%", "limit": limit}
+            )
+            return [row[0] for row in rows]
+
+        if dialect == "postgresql":
+            stmt = (
+                select(Visitor.id)
+                .where(or_(*matches))
+                .order_by(
+                    or_(*[column.ilike(f"{query}%") for column in columns]).desc(),
+                    func.greatest(*[func.similarity(column, query) for column in columns]).desc()
+                )
+                .limit(limit)
+            )
+            return list(db.execute(stmt).scalars())
+
+    # Short queries or no index: plain substring scan
+    stmt = (
+        select(Visitor.id)
+        .where(or_(*matches))
+        .order_by(Visitor.id)
+        .limit(limit)
+    )
+    return list(db.execute(stmt).scalars())
+
+if __name__ == "__main__":
+    # Backfill command: python -m services.visitor_search
+    from database import engine, init_db
+
+    init_db()
+    rebuild_search_index(engine)
@@ -1,46 +1,49 @@
 """
 Voice Processing Service - Whisper transcription + NER
 Production-grade with proper error handling and logging
+
+Uploads are decoded in memory to a 16 kHz float32 array and handed to the
+Whisper worker directly. Results are cached by audio hash, language hint and
+model, so a resubmitted clip skips decoding and inference. With VOICE_DEBUG_AUDIO_FILES the upload is instead
+written to data/audio and kept there, and Whisper reads it from disk.
 """
+import asyncio
+import os
 import tempfile
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple
 
+from starlette.concurrency import run_in_threadpool
+
 from core import settings, logger
 
-# Whisper will be loaded lazily
-_whisper_model = None
+from services.audio_decoder import decode_audio, AudioDecodeError
+from services.transcript_cache import transcript_cache, transcript_key, MISS
+from services.whisper_worker import whisper_worker, WhisperUnavailable
 
 
-def get_whisper_model():
-    """Lazy load Whisper model"""
-    global _whisper_model
-    if settings.use_mock_whisper:
-        logger.info("whisper_mock_mode", message="Using mock transcription")
-        return None
-        
-    if _whisper_model is None:
-        try:
-            import whisper
-            logger.info("whisper_loading", model=settings.whisper_model)
-            _whisper_model = whisper.load_model(settings.whisper_model)
-            logger.info("whisper_loaded")
-        except ImportError:
-            logger.warning("whisper_not_installed", message="Using mock mode")
-            return None
-        except Exception as e:
-            logger.error("whisper_load_failed", error=str(e))
-            return None
-    return _whisper_model
-
-
-def transcribe_audio(audio_path: str, language: Optional[str] = None) -> Dict:
+def _failed(language: Optional[str], error: str) -> Dict:
+    return {
+        "text": "",
+        "language": language or "en",
+        "success": False,
+        "error": error
+    }
+
+
+async def transcribe_audio(
+    audio_bytes: bytes,
+    language: Optional[str] = None,
+    extension: str = ".wav"
+) -> Dict:
     """
-    Transcribe audio file using Whisper.
+    Transcribe uploaded audio using the preloaded Whisper worker.
     
     Args:
-        audio_path: Path to audio file
+        audio_bytes: Raw upload (WAV, or any format ffmpeg can read)
         language: Language code ('en', 'ar') or None for auto-detect
+        extension: Upload file extension, used for debug audio files
     
     Returns:
         {
@@ -50,36 +53,61 @@ def transcribe_audio(audio_path: str, language: Optional[str] = None) -> Dict:
             "error": str or None
         }
     """
-    model = get_whisper_model()
-    
-    if model is None:
+    if whisper_worker.is_mock:
         # Mock mode for testing without Whisper
-        return mock_transcribe(audio_path)
+        return mock_transcribe()
+    
+    key = transcript_key(audio_bytes, language, whisper_worker.model_name)
+    cached = await run_in_threadpool(transcript_cache.get, key)
+    if cached is not MISS:
+        return {**cached, "success": True, "error": None, "cached": True}
+    
+    if settings.voice_debug_audio_files:
+        audio = await run_in_threadpool(save_audio_file, audio_bytes, extension)
+    else:
+        try:
+            audio = await run_in_threadpool(decode_audio, audio_bytes)
+        except AudioDecodeError as e:
+            return _failed(language, str(e))
+    
+    transcription = await transcribe_samples(audio, language)
+    if transcription["success"] and not transcription.get("mock"):
+        await run_in_threadpool(
+            transcript_cache.put, key,
+            {"text": transcription["text"], "language": transcription["language"]}
+        )
+    return transcription
+
+
+async def transcribe_samples(audio, language: Optional[str] = None) -> Dict:
+    """
+    Transcribe already-decoded audio (16 kHz float32 array, or a file path).
+    Same result shape as transcribe_audio().
+    """
+    if whisper_worker.is_mock:
+        return mock_transcribe()
     
     try:
-        # Transcribe with language hint if provided
-        options = {}
-        if language:
-            options["language"] = language
-        
-        result = model.transcribe(audio_path, **options)
-        
-        return {
-            "text": result["text"].strip(),
-            "language": result.get("language", language or "en"),
-            "success": True,
-            "error": None
-        }
+        result = await whisper_worker.transcribe(audio, language)
+    except WhisperUnavailable as e:
+        # Crashed / restarting / failed worker: never invent a transcript here,
+        # /process and the stream would create a real approval from it
+        return _failed(language, f"Transcription unavailable: {e}")
+    except asyncio.TimeoutError:
+        logger.warning("whisper_job_timeout", timeout=settings.whisper_job_timeout_seconds)
+        return _failed(language, "Transcription timed out")
     except Exception as e:
-        return {
-            "text": "",
-            "language": language or "en",
-            "success": False,
-            "error": str(e)
-        }
+        return _failed(language, str(e))
+    
+    return {
+        "text": result["text"],
+        "language": result.get("language") or language or "en",
+        "success": True,
+        "error": None
+    }
 
 
-def mock_transcribe(audio_path: str) -> Dict:
+def mock_transcribe() -> Dict:
     """
     Mock transcription for testing without Whisper.
     Returns sample responses based on random selection.
@@ -104,10 +132,11 @@ def mock_transcribe(audio_path: str) -> Dict:
     }
 
 
-def process_voice_command(
-    audio_path: str, 
+async def process_voice_command(
+    audio_bytes: bytes, 
     resident_id: int,
-    language: Optional[str] = None
+    language: Optional[str] = None,
+    extension: str = ".wav"
 ) -> Dict:
     """
     Full voice processing pipeline:
@@ -128,10 +157,16 @@ def process_voice_command(
             "error": str or None
         }
     """
-    from utils.ner_extractor import extract_visitor_entities
-    
     # Step 1: Transcribe
-    transcription = transcribe_audio(audio_path, language)
+    transcription = await transcribe_audio(audio_bytes, language, extension)
+    
+    # Step 2: Extract entities
+    return command_result(transcription, language)
+
+
+def command_result(transcription: Dict, language: Optional[str] = None) -> Dict:
+    """Extract visitor entities from a transcription (process_voice_command result shape)"""
+    from utils.ner_extractor import extract_visitor_entities
     
     if not transcription["success"]:
         return {
@@ -142,7 +177,6 @@ def process_voice_command(
             "error": transcription["error"]
         }
     
-    # Step 2: Extract entities
     entities = extract_visitor_entities(
         transcription["text"], 
         transcription["language"]
@@ -158,24 +192,14 @@ def process_voice_command(
     }
 
 
-def save_audio_temp(audio_bytes: bytes, extension: str = ".wav") -> str:
-    """Save audio bytes to temp file and return path"""
-    os.makedirs(AUDIO_DIR, exist_ok=True)
-    
+def save_audio_file(audio_bytes: bytes, extension: str = ".wav") -> str:
+    """Debug mode: keep the upload under data/audio and return its path"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"voice_{timestamp}{extension}"
-    filepath = os.path.join(AUDIO_DIR, filename)
+    filename = f"voice_{timestamp}_{uuid.uuid4().hex[:8]}{extension}"
+    filepath = os.path.join(settings.audio_dir, filename)
     
     with open(filepath, "wb") as f:
         f.write(audio_bytes)
     
+    logger.debug("voice_audio_saved", path=filepath, size=len(audio_bytes))
     return filepath
-
-
-def cleanup_audio(filepath: str):
-    """Delete temporary audio file"""
-    try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-    except Exception:
-        pass  # Ignore cleanup errors
@@ -0,0 +1,108 @@
+"""
+Streaming voice transcription session
+Audio arrives from /api/voice/stream as raw 16-bit mono PCM chunks while the
+resident is still holding the mic. Every VOICE_STREAM_PARTIAL_SECONDS of new
+audio the latest VOICE_STREAM_WINDOW_SECONDS are re-transcribed in the
+background (one job per stream at a time) and a partial transcript with
+provisional entities is pushed back. On release only the audio since the
+last partial is still unprocessed, so the final result is either that
+partial or one short job away.
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional, Tuple
+
+from core import settings, logger
+from services.audio_decoder import decode_pcm16
+from services.voice_processor import transcribe_samples, command_result
+
+BYTES_PER_SAMPLE = 2
+
+
+class VoiceStream:
+    """Buffered PCM of one streaming voice command and its partial transcripts"""
+
+    def __init__(
+        self,
+        language: Optional[str],
+        sample_rate: int,
+        on_partial: Callable[[dict], Awaitable[None]],
+    ):
+        self.language = language
+        self.sample_rate = sample_rate
+        self._on_partial = on_partial
+        self._pcm = bytearray()
+        self._bytes_per_second = sample_rate * BYTES_PER_SAMPLE
+        self._max_bytes = settings.voice_stream_max_seconds * self._bytes_per_second
+        self._partial_bytes = int(settings.voice_stream_partial_seconds * self._bytes_per_second)
+        self._window_bytes = settings.voice_stream_window_seconds * self._bytes_per_second
+        self._task: Optional[asyncio.Task] = None
+        self._scheduled_at = 0  # buffer length when the last partial was started
+        # (start, end, transcription) of the last successful partial
+        self._last: Optional[Tuple[int, int, dict]] = None
+
+    @property
+    def seconds(self) -> float:
+        return len(self._pcm) / self._bytes_per_second
+
+    @property
+    def full(self) -> bool:
+        """VOICE_STREAM_MAX_SECONDS reached; further audio is dropped"""
+        return len(self._pcm) >= self._max_bytes
+
+    def feed(self, chunk: bytes):
+        """Append a PCM chunk and start a partial job if enough new audio has arrived"""
+        self._pcm.extend(chunk[: self._max_bytes - len(self._pcm)])
+        if self._task is None and len(self._pcm) - self._scheduled_at >= self._partial_bytes:
+            self._scheduled_at = len(self._pcm)
+            self._task = asyncio.create_task(self._run_partial(len(self._pcm)))
+
+    def _window(self, end: int) -> int:
+        start = max(0, end - self._window_bytes)
+        return start - start % BYTES_PER_SAMPLE
+
+    async def _transcribe(self, start: int, end: int) -> dict:
+        samples = decode_pcm16(bytes(self._pcm[start:end]), self.sample_rate)
+        return await transcribe_samples(samples, self.language)
+
+    async def _run_partial(self, end: int):
+        start = self._window(end)
+        try:
+            transcription = await self._transcribe(start, end)
+            if not transcription["success"]:
+                return
+            self._last = (start, end, transcription)
+            result = command_result(transcription, self.language)
+            await self._on_partial({
+                "type": "partial",
+                "transcript": result["transcript"],
+                "language": result["language"],
+                "extracted": result["extracted"],
+                "audio_seconds": round(end / self._bytes_per_second, 2),
+                "is_mock": result["is_mock"],
+            })
+        except Exception as e:
+            logger.warning("voice_stream_partial_failed", error=str(e))
+        finally:
+            self._task = None
+
+    async def finish(self) -> Tuple[dict, bool]:
+        """
+        Final command result over the whole utterance.
+        Returns (result, reused) where `reused` means the last partial already
+        covered every byte received and no new transcription was needed.
+        """
+        task = self._task
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+        end = len(self._pcm)
+        if end < BYTES_PER_SAMPLE:
+            return command_result({"success": False, "error": "No audio received"}, self.language), False
+
+        if self._last is not None and self._last[0] == 0 and self._last[1] == end:
+            return command_result(self._last[2], self.language), True
+        return command_result(await self._transcribe(0, end), self.language), False
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,397 @@
+"""
+Whisper transcription worker process
+The configured model is loaded once at application startup in a dedicated
+process and warmed up on a short silent clip. The API submits jobs over a
+multiprocessing queue and awaits the results without blocking the event
+loop. If the worker dies its in-flight jobs fail immediately and it is
+restarted with exponential backoff; after WHISPER_MAX_RESTARTS consecutive
+crashes it is marked failed. Only mock mode (USE_MOCK_WHISPER, or
+openai-whisper not installed) serves mock transcripts.
+
+Concurrent jobs are micro-batched: after taking a job the worker collects
+more for up to WHISPER_BATCH_WINDOW_MS or WHISPER_BATCH_MAX_SIZE jobs, pads
+the clips to Whisper's 30 s window and runs one batched decode per language
+hint. Clips longer than the window, file paths (debug mode) and lone jobs
+go through model.transcribe() as before.
+"""
+import asyncio
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from core import settings, logger, metrics
+
+SAMPLE_RATE = 16000
+WARMUP_SECONDS = 1  # Length of the silent clip transcribed during warm-up
+
+# Delay before restarting a crashed worker; doubles per consecutive crash
+RESTART_BACKOFF_SECONDS = 1
+MAX_RESTART_BACKOFF_SECONDS = 60
+
+# Worker states reported by health()
+STARTING, LOADING, WARMING, READY = "starting", "loading", "warming", "ready"
+RESTARTING, FAILED, STOPPED, MOCK = "restarting", "failed", "stopped", "mock"
+UNAVAILABLE = "unavailable"  # Sent by the worker when openai-whisper is missing; becomes MOCK
+
+
+class WhisperUnavailable(Exception):
+    """Raised when no Whisper model can serve the job (mock mode, crashed, restarting, failed, stopped)"""
+
+
+def _collect_batch(requests, first, window_seconds: float, max_size: int):
+    """
+    Gather jobs queued behind `first` for up to `window_seconds`.
+    Returns (jobs, stop) where `stop` means the shutdown sentinel was seen.
+    """
+    batch = [first]
+    deadline = time.monotonic() + window_seconds
+    while len(batch) < max_size:
+        remaining = deadline - time.monotonic()
+        try:
+            job = requests.get(timeout=remaining) if remaining > 0 else requests.get_nowait()
+        except queue.Empty:
+            break
+        if job is None:
+            return batch, True
+        batch.append(job)
+    return batch, False
+
+
+def _run_batch(whisper, model, batch, responses):
+    """Transcribe a batch of jobs and send one result message per job"""
+    import torch
+
+    n_mels = getattr(model.dims, "n_mels", 80)
+    groups: Dict[Optional[str], list] = {}
+    single = []
+    for job in batch:
+        audio = job[1]
+        if isinstance(audio, str) or len(audio) > whisper.audio.N_SAMPLES:
+            single.append(job)
+        else:
+            groups.setdefault(job[2].get("language"), []).append(job)
+
+    for language, jobs in groups.items():
+        if len(jobs) == 1:
+            single.extend(jobs)
+            continue
+        try:
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), n_mels)
+                for _, audio, _ in jobs
+            ]).to(model.device)
+            decoded = model.decode(
+                mel, whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+            )
+        except Exception:
+            single.extend(jobs)  # Retry individually so one bad clip doesn't fail the batch
+            continue
+        for (job_id, _, _), result in zip(jobs, decoded):
+            responses.put(("result", job_id, {
+                "text": result.text.strip(),
+                "language": result.language,
+                "batch_size": len(jobs),
+            }))
+
+    for job_id, audio, options in single:
+        try:
+            result = model.transcribe(audio, fp16=False, **options)
+            responses.put(("result", job_id, {
+                "text": result["text"].strip(),
+                "language": result.get("language"),
+                "batch_size": 1,
+            }))
+        except Exception as e:
+            responses.put(("error", job_id, str(e)))
+
+
+def _worker_main(model_name: str, batch_window_ms: int, batch_max_size: int, requests, responses):
+    """
+    Entry point of the worker process.
+    Sends ("status", state, info) messages, then ("result", job_id, result)
+    or ("error", job_id, message) for each (job_id, audio, options) job.
+    """
+    responses.put(("status", LOADING, {}))
+    try:
+        import numpy as np
+        import whisper
+        model = whisper.load_model(model_name)
+    except ImportError:
+        responses.put(("status", UNAVAILABLE, {"error": "openai-whisper is not installed"}))
+        return
+    except Exception as e:
+        responses.put(("status", FAILED, {"error": str(e)}))
+        return
+
+    responses.put(("status", WARMING, {}))
+    started = time.perf_counter()
+    model.transcribe(np.zeros(SAMPLE_RATE * WARMUP_SECONDS, dtype=np.float32), fp16=False)
+    responses.put(("status", READY, {"warmup_ms": round((time.perf_counter() - started) * 1000)}))
+
+    while True:
+        job = requests.get()
+        if job is None:
+            return
+        batch, stop = _collect_batch(requests, job, batch_window_ms / 1000, max(1, batch_max_size))
+        _run_batch(whisper, model, batch, responses)
+        if stop:
+            return
+
+
+class WhisperWorker:
+    """Owns the worker process and routes its results back to awaiting requests"""
+
+    def __init__(self, model_name: str = settings.whisper_model):
+        self.model_name = model_name
+        self._ctx = mp.get_context("spawn")  # never fork a process holding threads / sockets
+        self._process = None
+        self._requests = None
+        self._responses = None
+        self._reader: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._state = STOPPED
+        self._info: dict = {}
+        self._stopping = False
+        self._wake = threading.Event()  # Interrupts the restart backoff on stop()
+        self._started_at: Optional[float] = None
+        self._crashes = 0  # Consecutive crashes since the worker was last ready
+        self.restarts = 0
+        self.completed = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_mock(self) -> bool:
+        """Mock transcription mode (configured, or openai-whisper not installed)"""
+        return self._state == MOCK
+
+    @property
+    def available(self) -> bool:
+        """Whether jobs can be submitted (model loaded or still loading)"""
+        return self._state in (STARTING, LOADING, WARMING, READY)
+
+    # ============== Lifecycle ==============
+
+    def start(self):
+        """Spawn the worker and begin loading the model (returns immediately)"""
+        if settings.use_mock_whisper:
+            self._state = MOCK
+            logger.info("whisper_mock_mode", message="Using mock transcription")
+            return
+        if self._process is not None:
+            return
+
+        self._stopping = False
+        self._wake.clear()
+        self._crashes = 0
+        self._spawn()
+        self._reader = threading.Thread(target=self._read_responses, name="whisper-results", daemon=True)
+        self._reader.start()
+
+    def _spawn(self):
+        self._requests = self._ctx.Queue()
+        self._responses = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                self.model_name, settings.whisper_batch_window_ms, settings.whisper_batch_max_size,
+                self._requests, self._responses,
+            ),
+            name="whisper-worker",
+            daemon=True,
+        )
+        self._process.start()
+        self._state = STARTING
+        self._info = {}
+        self._started_at = time.time()
+        logger.info("whisper_worker_started", model=self.model_name, pid=self._process.pid)
+
+    def stop(self):
+        """Ask the worker to exit, then fail anything still waiting"""
+        self._stopping = True
+        self._wake.set()
+        if self._process is not None:
+            try:
+                self._requests.put(None)
+            except (OSError, ValueError):
+                pass
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._state != MOCK:
+            self._state = STOPPED
+        self._fail_pending("Whisper worker stopped")
+
+    # ============== Results ==============
+
+    def _read_responses(self):
+        """Reader thread: apply status updates and resolve job futures"""
+        while not self._stopping:
+            try:
+                kind, key, payload = self._responses.get(timeout=1)
+            except queue.Empty:
+                if self._process is not None and not self._process.is_alive() and not self._stopping:
+                    self._handle_exit()
+                continue
+            except (EOFError, OSError, ValueError):
+                continue
+
+            if kind == "status":
+                self._info.update(payload)
+                if key == UNAVAILABLE:
+                    logger.warning("whisper_not_installed", message="Using mock mode")
+                    self._state = MOCK
+                else:
+                    logger.info("whisper_worker_state", state=key, **payload)
+                    self._state = key
+                if key == READY:
+                    self._crashes = 0
+                if key in (UNAVAILABLE, FAILED):
+                    self._fail_pending(payload.get("error", "Whisper unavailable"))
+            elif kind == "result":
+                self.completed += 1
+                batch_size = payload.pop("batch_size", 1)
+                metrics.increment("whisper_jobs")
+                if batch_size > 1:
+                    metrics.increment("whisper_batched_jobs")
+                self._resolve(key, payload)
+            else:
+                self._resolve(key, RuntimeError(payload))
+
+    def _handle_exit(self):
+        """
+        The worker process died: fail its jobs, then restart it after an
+        exponential backoff, or mark it failed after WHISPER_MAX_RESTARTS
+        consecutive crashes. A worker that exited on purpose (model failed
+        to load, whisper not installed) is not restarted.
+        """
+        exitcode = self._process.exitcode
+        with self._lock:
+            # Taking the dead worker's jobs and leaving the available states in
+            # one step means no new job can be queued to the dead process
+            crashed_in = self._state
+            self._process = None
+            waiters = list(self._pending.values())
+            self._pending.clear()
+            if crashed_in not in (FAILED, MOCK):
+                self._crashes += 1
+                if self._crashes > settings.whisper_max_restarts:
+                    self._state = FAILED
+                    self._info["error"] = f"Whisper worker crashed {self._crashes} times in a row"
+                else:
+                    self._state = RESTARTING
+        _fail_waiters(waiters, f"Whisper worker exited ({exitcode})")
+
+        if self._state != RESTARTING:
+            if crashed_in not in (FAILED, MOCK):
+                logger.error("whisper_worker_failed", exitcode=exitcode, crashes=self._crashes)
+            return
+
+        delay = min(RESTART_BACKOFF_SECONDS * 2 ** (self._crashes - 1), MAX_RESTART_BACKOFF_SECONDS)
+        logger.error(
+            "whisper_worker_died",
+            exitcode=exitcode, state=crashed_in, attempt=self._crashes, restart_in_seconds=delay
+        )
+        if self._wake.wait(delay):
+            return  # stop() during backoff
+        with self._lock:
+            if self._stopping:
+                return
+            self.restarts += 1
+            self._spawn()
+
+    def _resolve(self, job_id: int, outcome):
+        with self._lock:
+            waiter = self._pending.pop(job_id, None)
+        if waiter is None:
+            return  # Caller timed out
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(_set_outcome, future, outcome)
+        except RuntimeError:
+            pass  # Caller's loop closed
+
+    def _fail_pending(self, message: str):
+        with self._lock:
+            waiters = list(self._pending.values())
+            self._pending.clear()
+        _fail_waiters(waiters, message)
+
+    # ============== Jobs ==============
+
+    async def transcribe(self, audio, language: Optional[str] = None) -> dict:
+        """
+        Transcribe `audio` (file path or 16 kHz float32 array) in the worker.
+        Returns {"text", "language"}.
+
+        Raises:
+            WhisperUnavailable: mock mode, or the worker crashed, is restarting,
+                failed or was stopped
+            asyncio.TimeoutError: no result within WHISPER_JOB_TIMEOUT_SECONDS
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = next(self._ids)
+        options = {"language": language} if language else {}
+        submitted = time.perf_counter()
+        with self._lock:
+            if not self.available:
+                raise WhisperUnavailable(self._info.get("error") or f"Whisper worker is {self._state}")
+            self._pending[job_id] = (loop, future)
+            self._requests.put((job_id, audio, options))
+        try:
+            result = await asyncio.wait_for(future, timeout=settings.whisper_job_timeout_seconds)
+            metrics.observe("whisper_job", time.perf_counter() - submitted)
+            return result
+        finally:
+            with self._lock:
+                self._pending.pop(job_id, None)
+
+    def health(self) -> dict:
+        """Worker state for /health and /api/voice/health"""
+        alive = self._process is not None and self._process.is_alive()
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "state": self._state,
+            "model": self.model_name,
+            "pid": self._process.pid if alive else None,
+            "alive": alive,
+            "pending_jobs": pending,
+            "completed_jobs": self.completed,
+            "batch_window_ms": settings.whisper_batch_window_ms,
+            "batch_max_size": settings.whisper_batch_max_size,
+            "restarts": self.restarts,
+            "consecutive_crashes": self._crashes,
+            "warmup_ms": self._info.get("warmup_ms"),
+            "error": self._info.get("error"),
+            "uptime_seconds": round(time.time() - self._started_at) if alive and self._started_at else None,
+        }
+
+
+def _set_outcome(future: asyncio.Future, outcome):
+    if future.done():
+        return
+    if isinstance(outcome, BaseException):
+        future.set_exception(outcome)
+    else:
+        future.set_result(outcome)
+
+
+def _fail_waiters(waiters, message: str):
+    for loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(_set_outcome, future, WhisperUnavailable(message))
+        except RuntimeError:
+            pass  # Caller's loop closed
+
+
+whisper_worker = WhisperWorker()
@@ -0,0 +1,83 @@
+"""
+Shared test fixtures
+Tests run against a throwaway SQLite database and photo store; the
+environment is set before any application module reads settings.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+TEST_DIR = Path(tempfile.mkdtemp(prefix="vms-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR / 'test.db'}"
+os.environ["USE_MOCK_WHISPER"] = "true"
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import services.face_service as face_service
+from services.photo_manager import photo_manager
+
+photo_manager.photos_dir = TEST_DIR / "photos"
+photo_manager.variants_dir = TEST_DIR / "photo_variants"
+photo_manager.photos_dir.mkdir(exist_ok=True)
+photo_manager.variants_dir.mkdir(exist_ok=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def capture_statements():
+    """
+    Context manager collecting (statement, parameters) for everything run on
+    the sync and async engines while it is open
+    """
+    from database import async_engine, engine
+
+    @contextmanager
+    def capture():
+        captured = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        targets = (engine, async_engine.sync_engine)
+        for target in targets:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield captured
+        finally:
+            for target in targets:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+    return capture
+
+
+class StubCascade:
+    """Haar cascade stand-in that finds one face at a fixed box"""
+
+    def detectMultiScale(self, gray, **kwargs):
+        return np.array([[50, 50, 200, 200]])
+
+
+@pytest.fixture
+def stub_cascade(monkeypatch):
+    """Deterministic face detection, so tests don't depend on photographs of real faces"""
+    monkeypatch.setattr(face_service, "get_face_cascade", lambda: StubCascade())
+
+
+def face_photo(color, seed: int = 0) -> bytes:
+    """JPEG whose 'face' region is dominated by `color` (BGR)"""
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    image[:, :320] = color
+    return cv2.imencode(".jpg", image)[1].tobytes()
@@ -0,0 +1,108 @@
+"""
+The approval cache never serves stale state to guards: check-status and
+active-approvals reflect /approve, /deny and window expiry as soon as they
+happen, even when the cache was warm beforehand
+"""
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import Approval, Resident, Visitor
+from services.time_validator import check_and_expire_approvals
+
+_apt_numbers = iter(range(1, 10000))
+
+
+def _pending_approval() -> tuple:
+    """(approval_id, visitor_id) of a fresh pending request"""
+    db = SessionLocal()
+    try:
+        resident = Resident(apt_number=f"C{next(_apt_numbers)}", name="Cache Resident", phone="+971500000001")
+        visitor = Visitor(name="Cache Visitor", purpose="Guest")
+        db.add_all([resident, visitor])
+        db.flush()
+        approval = Approval(resident_id=resident.id, visitor_id=visitor.id, status="pending")
+        db.add(approval)
+        db.commit()
+        return approval.id, visitor.id
+    finally:
+        db.close()
+
+
+def _status(client, visitor_id: int) -> dict:
+    response = client.get(f"/api/visitors/check-status/{visitor_id}")
+    assert response.status_code == 200
+    return response.json()
+
+
+def _active_ids(client) -> set:
+    response = client.get("/api/guards/active-approvals")
+    assert response.status_code == 200
+    return {row["approval_id"] for row in response.json()["active_approvals"]}
+
+
+def _advance_clock(monkeypatch, delta: timedelta):
+    """Move utcnow() forward for the endpoints and the expiry job"""
+    frozen = datetime.utcnow() + delta
+
+    class _Later(datetime):
+        @classmethod
+        def utcnow(cls):
+            return frozen
+
+    for module in ("api.guards", "api.visitors", "services.time_validator"):
+        monkeypatch.setattr(f"{module}.datetime", _Later)
+
+
+def test_check_status_reflects_approve_immediately(client):
+    approval_id, visitor_id = _pending_approval()
+    assert _status(client, visitor_id)["status"] == "pending"  # Warms the cache
+    assert approval_id not in _active_ids(client)
+
+    response = client.post("/api/visitors/approve", json={"approval_id": approval_id})
+    assert response.status_code == 200
+
+    status = _status(client, visitor_id)
+    assert status["status"] == "approved"
+    assert status["is_valid_now"] is True
+    assert approval_id in _active_ids(client)
+
+
+def test_check_status_reflects_deny_immediately(client):
+    approval_id, visitor_id = _pending_approval()
+    assert _status(client, visitor_id)["status"] == "pending"
+
+    response = client.post("/api/visitors/deny", json={"approval_id": approval_id, "reason": "Not expected"})
+    assert response.status_code == 200
+
+    status = _status(client, visitor_id)
+    assert status["status"] == "denied"
+    assert status["is_valid_now"] is False
+
+
+def test_check_status_reflects_expiry(client, monkeypatch):
+    approval_id, visitor_id = _pending_approval()
+    valid_until = datetime.utcnow() + timedelta(minutes=30)
+    response = client.post("/api/visitors/approve", json={
+        "approval_id": approval_id,
+        "valid_until": valid_until.isoformat(),
+    })
+    assert response.status_code == 200
+    assert _status(client, visitor_id)["is_valid_now"] is True
+    assert approval_id in _active_ids(client)
+
+    # Window over but the expiry job has not run: the warm cache must not admit the visitor
+    _advance_clock(monkeypatch, timedelta(minutes=31))
+    status = _status(client, visitor_id)
+    assert status["status"] == "approved"
+    assert status["is_valid_now"] is False
+    assert approval_id not in _active_ids(client)
+
+    db = SessionLocal()
+    try:
+        assert check_and_expire_approvals(db) >= 1
+    finally:
+        db.close()
+
+    status = _status(client, visitor_id)
+    assert status["status"] == "expired"
+    assert status["is_valid_now"] is False
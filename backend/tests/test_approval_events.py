@@ -0,0 +1,71 @@
+"""
+Bulk approval endpoints publish their events from the rows they just wrote,
+without re-reading each one from the database after commit
+"""
+import pytest
+
+from database import SessionLocal
+from models import RecurringVisitor, Resident
+
+_apt_numbers = iter(range(1, 10000))
+
+
+def _new_resident(recurring_visitors: int = 0) -> int:
+    """Resident with `recurring_visitors` daily recurring visitors"""
+    db = SessionLocal()
+    try:
+        resident = Resident(apt_number=f"E{next(_apt_numbers)}", name="Events Resident", phone="+971500000002")
+        db.add(resident)
+        db.flush()
+        db.add_all(
+            RecurringVisitor(resident_id=resident.id, name=f"Cleaner {i}", schedule="daily", time_window="00:00-23:59")
+            for i in range(recurring_visitors)
+        )
+        db.commit()
+        return resident.id
+    finally:
+        db.close()
+
+
+def _selects(statements) -> int:
+    return sum(1 for statement, _ in statements if statement.lstrip().upper().startswith("SELECT"))
+
+
+@pytest.fixture
+def resident_id(client) -> int:
+    return _new_resident()
+
+
+def _sync_selects(client, capture_statements, resident_id: int, events: int) -> int:
+    payload = {
+        "resident_id": resident_id,
+        "events": [{"title": f"Amazon delivery {i}", "time": "14:00"} for i in range(events)],
+    }
+    with capture_statements() as statements:
+        response = client.post("/api/calendar/sync", json=payload)
+    assert response.status_code == 200
+    assert response.json()["approvals_created"] == events
+    return _selects(statements)
+
+
+def test_calendar_sync_selects_do_not_grow_with_events(client, capture_statements, resident_id):
+    assert (
+        _sync_selects(client, capture_statements, resident_id, 5)
+        == _sync_selects(client, capture_statements, resident_id, 1)
+    )
+
+
+def _generate_selects(client, capture_statements, recurring_visitors: int) -> int:
+    resident_id = _new_resident(recurring_visitors)
+    with capture_statements() as statements:
+        response = client.post("/api/recurring-visitors/generate-today", params={"resident_id": resident_id})
+    assert response.status_code == 200
+    assert response.json()["approvals_created"] == recurring_visitors
+    return _selects(statements)
+
+
+def test_recurring_generate_selects_do_not_grow_with_visitors(client, capture_statements):
+    assert (
+        _generate_selects(client, capture_statements, 5)
+        == _generate_selects(client, capture_statements, 1)
+    )
@@ -0,0 +1,48 @@
+"""
+Resampling to Whisper's 16 kHz keeps the speech band and filters out what
+would otherwise alias into it
+"""
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from services.audio_decoder import SAMPLE_RATE, decode_audio, resample
+
+
+def _tone(frequency: float, rate: int, seconds: float = 1.0) -> np.ndarray:
+    return np.sin(2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate).astype(np.float32)
+
+
+def _rms(samples: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(samples[500:-500] ** 2)))  # Skip the edge taper
+
+
+@pytest.mark.parametrize("rate", [8000, 22050, 44100, 48000])
+def test_speech_band_passes(rate):
+    for frequency in (300, 1000, 3000):
+        out = resample(_tone(frequency, rate), rate)
+        assert len(out) == SAMPLE_RATE
+        assert _rms(out) == pytest.approx(_rms(_tone(frequency, SAMPLE_RATE)), rel=0.02)
+
+
+@pytest.mark.parametrize("rate", [44100, 48000])
+def test_content_above_8khz_does_not_alias(rate):
+    # A 12 kHz sibilant would fold to 4 kHz without the low-pass
+    assert _rms(resample(_tone(12000, rate), rate)) < 0.01 * _rms(_tone(12000, rate))
+
+
+def test_wav_upload_is_resampled():
+    pcm = (_tone(1000, 48000) * 16000).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(48000)
+        wav.writeframes(pcm.tobytes())
+
+    out = decode_audio(buffer.getvalue())
+    assert out.dtype == np.float32
+    assert len(out) == SAMPLE_RATE
+    assert _rms(out) == pytest.approx(16000 / 32768 / np.sqrt(2), rel=0.02)
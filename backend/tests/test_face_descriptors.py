@@ -0,0 +1,113 @@
+"""
+Descriptor scoring reproduces the original verify_faces: cv2.compareHist
+(HISTCMP_CORREL) on 32x32x32 histograms, the scores MATCH_THRESHOLD was set on
+"""
+import cv2
+import numpy as np
+
+from services.face_descriptors import _from_blob, _to_blob, DESCRIPTOR_BYTES
+from services.face_service import FaceImage, MATCH_THRESHOLD, match_confidences, verify_faces
+
+from conftest import face_photo
+
+
+def _face_photo(seed: int, tint, noise: float) -> bytes:
+    """Shaded, noisy patch in the stub cascade's face box"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:200, 0:200]
+    face = np.stack([x * 0.6 + tint[0], y * 0.5 + tint[1], (x + y) * 0.3 + tint[2]], axis=-1)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    image[50:250, 50:250] = np.clip(face + rng.normal(0, noise, face.shape), 0, 255)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def _baseline_confidence(image1: bytes, image2: bytes) -> float:
+    """verify_faces before descriptors: per-call histograms and cv2.compareHist"""
+    hists = []
+    for image in (image1, image2):
+        face = FaceImage.decode(image).crop_largest(padding=0)
+        face = cv2.resize(face, (128, 128))
+        hist = cv2.calcHist([face], [0, 1, 2], None, [32, 32, 32], [0, 256, 0, 256, 0, 256])
+        cv2.normalize(hist, hist)
+        hists.append(hist)
+    correlation = cv2.compareHist(hists[0], hists[1], cv2.HISTCMP_CORREL)
+    return round(max(0, correlation) * 100, 1)
+
+
+def _photos():
+    photos = [face_photo(color) for color in ((30, 90, 200), (60, 90, 180), (200, 200, 200))]
+    for seed, tint in enumerate(((40, 60, 30), (45, 62, 35), (120, 20, 90), (0, 0, 0))):
+        for noise in (0, 3, 12):
+            photos.append(_face_photo(seed, tint, noise))
+    return photos
+
+
+def test_scores_match_compare_hist(stub_cascade):
+    photos = _photos()
+    scores = []
+    for i, image1 in enumerate(photos):
+        for image2 in photos[i:]:
+            expected = _baseline_confidence(image1, image2)
+            result = verify_faces(image1, image2)
+            assert abs(result["confidence"] - expected) <= 0.1
+            assert result["match"] == (expected > MATCH_THRESHOLD)
+            scores.append(expected)
+    # The pairs cover matches, rejections and compareHist's zero scores
+    assert max(scores) > MATCH_THRESHOLD and 0 in scores
+
+
+def test_stored_descriptor_keeps_decisions(stub_cascade):
+    photos = _photos()
+    descriptors = [FaceImage.decode(photo).descriptor() for photo in photos]
+    blobs = [_to_blob(descriptor) for descriptor in descriptors]
+    assert all(len(blob) == DESCRIPTOR_BYTES for blob in blobs)
+
+    stored = np.vstack([_from_blob(blob) for blob in blobs])
+    for probe, photo in zip(descriptors, photos):
+        confidences = match_confidences(probe, stored)
+        expected = [_baseline_confidence(photo, other) for other in photos]
+        assert np.all(np.abs(confidences - expected) <= 1.0)
+        assert list(confidences > MATCH_THRESHOLD) == [e > MATCH_THRESHOLD for e in expected]
+
+
+
+def test_concurrent_puts_of_same_photo(client, stub_cascade, monkeypatch):
+    """A capture of identical bytes inserts the filename between put()'s lookup and commit"""
+    from sqlalchemy import false
+
+    from database import SessionLocal
+    from models import FaceDescriptor
+    from services import face_descriptors
+    from services.face_descriptors import face_descriptor_store
+
+    descriptor = FaceImage.decode(_face_photo(7, (40, 60, 30), 3)).descriptor()
+
+    class RacingSession:
+        def __init__(self):
+            self._session = SessionLocal()
+            self._raced = False
+
+        def query(self, *entities):
+            query = self._session.query(*entities)
+            if self._raced:
+                return query
+            self._raced = True
+            other = SessionLocal()
+            other.add(FaceDescriptor(photo_filename="race.jpg", content_hash="hash-a", descriptor=None))
+            other.commit()
+            other.close()
+            return query.filter(false())  # Looked up before the other request committed
+
+        def __getattr__(self, name):
+            return getattr(self._session, name)
+
+    monkeypatch.setattr(face_descriptors, "SessionLocal", RacingSession)
+    face_descriptor_store.put("race.jpg", "hash-b", descriptor)
+
+    db = SessionLocal()
+    try:
+        rows = db.query(FaceDescriptor).filter(FaceDescriptor.photo_filename == "race.jpg").all()
+    finally:
+        db.close()
+    assert [row.content_hash for row in rows] == ["hash-b"]
+    assert len(rows[0].descriptor) == DESCRIPTOR_BYTES
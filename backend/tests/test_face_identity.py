@@ -0,0 +1,72 @@
+"""
+Capture -> verify-identity / identify end to end
+"""
+from database import SessionLocal
+from models import Visitor
+from services.photo_manager import photo_manager
+
+from conftest import face_photo
+
+
+def _request_approval(client, name: str) -> int:
+    response = client.post("/api/visitors/request-approval", json={
+        "visitor_name": name,
+        "purpose": "Guest",
+        "apt_number": "501",
+    })
+    assert response.status_code == 200
+    return response.json()["visitor_id"]
+
+
+def _post_photo(client, path: str, photo: bytes, **data):
+    return client.post(path, files={"photo": ("photo.jpg", photo, "image/jpeg")}, data=data)
+
+
+def test_capture_then_verify_identity(client, stub_cascade):
+    visitor_id = _request_approval(client, "Capture Verify")
+    enrolled = face_photo((30, 90, 200))
+
+    captured = _post_photo(client, "/api/face/capture", enrolled, visitor_id=visitor_id)
+    assert captured.status_code == 200
+    photo_url = captured.json()["photo_url"]
+
+    db = SessionLocal()
+    try:
+        assert db.query(Visitor).filter(Visitor.id == visitor_id).first().photo_url == photo_url
+    finally:
+        db.close()
+
+    same = _post_photo(client, "/api/face/verify-identity", face_photo((30, 90, 200), seed=1), visitor_id=visitor_id)
+    assert same.status_code == 200
+    assert same.json()["match"] is True
+
+    other = _post_photo(client, "/api/face/verify-identity", face_photo((200, 40, 20)), visitor_id=visitor_id)
+    assert other.status_code == 200
+    assert other.json()["match"] is False
+
+
+def test_captured_visitor_is_identified(client, stub_cascade):
+    visitor_id = _request_approval(client, "Capture Identify")
+    photo = face_photo((20, 200, 60))
+    assert _post_photo(client, "/api/face/capture", photo, visitor_id=visitor_id).status_code == 200
+
+    response = _post_photo(client, "/api/face/identify", face_photo((20, 200, 60), seed=2))
+    assert response.status_code == 200
+    best = response.json()["candidates"][0]
+    assert best["visitor_id"] == visitor_id
+    assert best["match"] is True
+
+
+def test_photo_gc_keeps_captured_photos(client, stub_cascade):
+    visitor_id = _request_approval(client, "Capture GC")
+    filename = _post_photo(
+        client, "/api/face/capture", face_photo((120, 120, 20)), visitor_id=visitor_id
+    ).json()["filename"]
+
+    photo_manager.collect_unreferenced_photos(grace_hours=0)
+    assert photo_manager.photo_path(filename) is not None
+
+
+def test_capture_unknown_visitor(client, stub_cascade):
+    response = _post_photo(client, "/api/face/capture", face_photo((30, 90, 200)), visitor_id=999999)
+    assert response.status_code == 404
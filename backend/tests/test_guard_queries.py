@@ -0,0 +1,61 @@
+"""
+Guard dashboard endpoints issue a constant number of SQL statements,
+however many approvals they return (no per-row lazy loads)
+"""
+from datetime import datetime, timedelta
+from itertools import count as counter
+
+import pytest
+
+from database import SessionLocal
+from models import Approval, Resident, Visitor
+from services.approval_cache import approval_cache
+
+_apt_numbers = counter(1)
+
+
+def _add_approvals(count: int):
+    """`count` visitors approved for now, each with its own resident"""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for _ in range(count):
+            resident = Resident(apt_number=f"Q{next(_apt_numbers)}", name="Query Count", phone="+971500000000")
+            visitor = Visitor(name="Query Count Visitor", purpose="Guest")
+            db.add_all([resident, visitor])
+            db.flush()
+            db.add(Approval(
+                resident_id=resident.id,
+                visitor_id=visitor.id,
+                status="approved",
+                valid_from=now - timedelta(minutes=5),
+                valid_until=now + timedelta(hours=1),
+                created_at=now,
+            ))
+        db.commit()
+    finally:
+        db.close()
+    approval_cache.invalidate()
+
+
+def _statements_for(client, capture_statements, path: str, count_key: str):
+    approval_cache.invalidate()  # Active approvals come from the cache once loaded
+    with capture_statements() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len(statements), response.json()[count_key]
+
+
+@pytest.mark.parametrize("path, count_key", [
+    ("/api/guards/active-approvals", "count"),
+    ("/api/guards/expected-today", "total_expected"),
+])
+def test_statement_count_is_constant(client, capture_statements, path, count_key):
+    _add_approvals(1)
+    statements_small, rows_small = _statements_for(client, capture_statements, path, count_key)
+
+    _add_approvals(49)
+    statements_large, rows_large = _statements_for(client, capture_statements, path, count_key)
+
+    assert rows_large >= rows_small + 49
+    assert statements_large == statements_small
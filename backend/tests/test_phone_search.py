@@ -0,0 +1,57 @@
+"""
+Phone normalization and guard search by phone
+"""
+import pytest
+
+from utils.phone import normalize_phone, phone_search_digits
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+971 50 123 4567", "+971501234567"),
+    ("00971501234567", "+971501234567"),
+    ("050-123-4567", "+971501234567"),
+    ("04 123 4567", "+97141234567"),
+    ("12345", None),
+    ("1234567", None),
+    ("971501234567", "+971501234567"),
+    ("971 50 123 4567", "+971501234567"),
+    ("971501234", None),
+    ("0501234", None),
+    ("+12345", None),
+    ("Ahmed", None),
+    ("", None),
+])
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(raw, "971") == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("050-987", "50987"),
+    ("9876543", "9876543"),
+    ("+971 50", "97150"),
+    ("00971 5", "9715"),
+    ("Ahmed", None),
+])
+def test_phone_search_digits(query, expected):
+    assert phone_search_digits(query) == expected
+
+
+def _search(client, query: str) -> list:
+    response = client.get("/api/guards/search", params={"query": query})
+    assert response.status_code == 200
+    return [result["visitor_id"] for result in response.json()["results"]]
+
+
+def test_search_by_phone_digits(client):
+    response = client.post("/api/visitors/request-approval", json={
+        "visitor_name": "Phone Search",
+        "visitor_phone": "050-987-6543",
+        "purpose": "Guest",
+        "apt_number": "501",
+    })
+    assert response.status_code == 200
+    visitor_id = response.json()["visitor_id"]
+
+    for query in ("9876543", "050-987", "+971 50 987 6543", "971509876543", "050-987-6543", "987-6543"):
+        assert visitor_id in _search(client, query), query
+    assert visitor_id not in _search(client, "1234567")
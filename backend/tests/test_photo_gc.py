@@ -0,0 +1,84 @@
+"""
+Photo GC only removes blobs that are still unreferenced and past their grace
+period when it deletes them, not just when it listed them
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import SessionLocal
+from models import PhotoBlob, Visitor
+from services.photo_manager import photo_manager
+
+
+def _stale_blob(data: bytes) -> str:
+    """An unreferenced blob last stored two days ago"""
+    filename = photo_manager.store_photo(data)
+    db = SessionLocal()
+    try:
+        db.query(PhotoBlob).filter(PhotoBlob.content_hash == filename[:64]).update(
+            {"stored_at": datetime.utcnow() - timedelta(days=2)}
+        )
+        db.commit()
+    finally:
+        db.close()
+    return filename
+
+
+def _blob_row(filename: str):
+    db = SessionLocal()
+    try:
+        return db.get(PhotoBlob, filename[:64])
+    finally:
+        db.close()
+
+
+class _RaceOnFirstDelete:
+    """Stands in for the blob lock and runs `race` just before GC's first DELETE"""
+
+    def __init__(self, race):
+        self._lock = threading.Lock()
+        self._race = race
+
+    def __enter__(self):
+        if self._race:
+            race, self._race = self._race, None
+            race()
+        return self._lock.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._lock.__exit__(*exc_info)
+
+
+def _reference(filename: str):
+    db = SessionLocal()
+    try:
+        db.add(Visitor(name="GC Reference", photo_url=f"/api/photos/{filename}"))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("race", ["restored", "referenced"])
+def test_gc_rechecks_at_delete_time(client, monkeypatch, race):
+    filename = _stale_blob(f"gc race {race}".encode())
+    if race == "restored":
+        racer = lambda: photo_manager._record_blob(filename[:64], 0)
+    else:
+        racer = lambda: _reference(filename)
+    monkeypatch.setattr(photo_manager, "_blob_lock", _RaceOnFirstDelete(racer))
+
+    photo_manager.collect_unreferenced_photos(grace_hours=1)
+
+    assert photo_manager.photo_path(filename) is not None
+    assert _blob_row(filename) is not None
+
+
+def test_gc_removes_stale_unreferenced_blob(client):
+    filename = _stale_blob(b"gc stale unreferenced")
+
+    assert photo_manager.collect_unreferenced_photos(grace_hours=1) >= 1
+
+    assert photo_manager.photo_path(filename) is None
+    assert _blob_row(filename) is None
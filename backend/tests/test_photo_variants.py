@@ -0,0 +1,53 @@
+"""
+Resized photo variants (/api/photos/<name>?w=)
+"""
+import cv2
+import numpy as np
+
+from services.photo_manager import photo_manager
+
+
+def _legacy_photo(filename: str, color) -> str:
+    """A flat (pre content-addressing) photo file"""
+    image = np.full((400, 600, 3), color, dtype=np.uint8)
+    ok, buffer = cv2.imencode(".png" if filename.endswith(".png") else ".jpg", image)
+    (photo_manager.photos_dir / filename).write_bytes(buffer.tobytes())
+    return filename
+
+
+def _variant(client, filename: str, width: int = 64):
+    response = client.get(f"/api/photos/{filename}", params={"w": width})
+    assert response.status_code == 200
+    return response
+
+
+def test_same_stem_photos_get_separate_variants(client):
+    jpg = _legacy_photo("variant-stem.jpg", (0, 0, 255))
+    png = _legacy_photo("variant-stem.png", (255, 0, 0))
+
+    red = cv2.imdecode(np.frombuffer(_variant(client, jpg).content, np.uint8), cv2.IMREAD_COLOR)
+    blue = cv2.imdecode(np.frombuffer(_variant(client, png).content, np.uint8), cv2.IMREAD_COLOR)
+
+    assert red.shape[1] == blue.shape[1] == 64
+    assert red[..., 2].mean() > 200 and blue[..., 0].mean() > 200
+
+
+def test_variant_etag_derives_from_source(client, monkeypatch):
+    from services import photo_manager as photo_manager_module
+
+    filename = _legacy_photo("variant-etag.jpg", (0, 200, 0))
+    etag = _variant(client, filename).headers["etag"]
+
+    hashed = []
+    real_sha256 = photo_manager_module.hashlib.sha256
+    monkeypatch.setattr(photo_manager_module.hashlib, "sha256", lambda *a: hashed.append(a) or real_sha256(*a))
+
+    for _ in range(5):
+        assert _variant(client, filename).headers["etag"] == etag
+    source_etag = client.get(f"/api/photos/{filename}").headers["etag"]
+
+    assert etag == f'{source_etag[:-1]}-w64"'
+    assert hashed == []  # Served from the source's cached hash; the variant file is never rehashed
+    assert client.get(
+        f"/api/photos/{filename}", params={"w": 64}, headers={"If-None-Match": etag}
+    ).status_code == 304
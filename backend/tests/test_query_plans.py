@@ -0,0 +1,139 @@
+"""
+Hot approval queries are answered from an index, on fresh and migrated
+databases alike (EXPLAIN QUERY PLAN)
+"""
+import re
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+
+from database import Base, SessionLocal, engine
+from migrations import MIGRATIONS, run_migrations
+from services.approval_cache import approval_cache
+from services.time_validator import check_and_expire_approvals
+
+APPROVAL_INDEX = re.compile(r"SEARCH approvals USING (COVERING )?INDEX ix_approvals_")
+APPROVAL_STATEMENT = re.compile(r"\b(FROM|UPDATE) approvals\b")
+
+PLAN_VISITOR_NAME = "Query Plan Visitor"
+
+# Indexes added after the first release, which a pre-series database lacks
+SERIES_INDEXES = {
+    "approvals": [
+        "ix_approvals_visitor_created",
+        "ix_approvals_status_valid_until",
+        "ix_approvals_status_created",
+        "ix_approvals_resident_status_created",
+        "ix_approvals_resident_method_created",
+    ],
+    "visitors": ["ix_visitors_phone_e164"],
+}
+
+
+def query_plan(bind, statement: str, parameters=()) -> str:
+    raw = bind.raw_connection()
+    try:
+        rows = raw.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        raw.close()
+    return "\n".join(row[-1] for row in rows)
+
+
+def _expire_approvals():
+    db = SessionLocal()
+    try:
+        check_and_expire_approvals(db)
+    finally:
+        db.close()
+
+
+def _active_approvals(client):
+    approval_cache.invalidate()
+    client.get("/api/guards/active-approvals")
+
+
+def _check_status(client, visitor_id: int):
+    approval_cache.invalidate()  # Latest approvals are cached once loaded
+    client.get(f"/api/visitors/check-status/{visitor_id}")
+
+
+def _plan_visitor_id(client) -> int:
+    """A visitor with a pending approval, created on first use"""
+    results = client.get("/api/visitors/check-by-name", params={"name": PLAN_VISITOR_NAME})
+    if results.status_code == 200:
+        return results.json()["results"][0]["visitor_id"]
+    response = client.post("/api/visitors/request-approval", json={
+        "visitor_name": PLAN_VISITOR_NAME,
+        "purpose": "Guest",
+        "apt_number": "501",
+    })
+    return response.json()["visitor_id"]
+
+
+HOT_QUERIES = {
+    "active": lambda client, _: _active_approvals(client),
+    "expected-today": lambda client, _: client.get("/api/guards/expected-today"),
+    "guard-search": lambda client, _: client.get("/api/guards/search", params={"query": PLAN_VISITOR_NAME}),
+    "check-status": _check_status,
+    "check-by-name": lambda client, _: client.get("/api/visitors/check-by-name", params={"name": PLAN_VISITOR_NAME}),
+    "visitors-pending": lambda client, _: client.get("/api/visitors/pending"),
+    "schedule-today": lambda client, _: client.get("/api/residents/1/schedule-today"),
+    "resident-pending": lambda client, _: client.get("/api/residents/1/pending-approvals"),
+    "calendar-events": lambda client, _: client.get("/api/calendar/events/1"),
+    "expiry": lambda client, _: _expire_approvals(),
+}
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(client, capture_statements, name):
+    visitor_id = _plan_visitor_id(client)
+    with capture_statements() as captured:
+        HOT_QUERIES[name](client, visitor_id)
+
+    approval_queries = [(s, p) for s, p in captured if APPROVAL_STATEMENT.search(s)]
+    assert approval_queries, f"{name} ran no approvals query"
+    for statement, parameters in approval_queries:
+        plan = query_plan(engine, statement, parameters)
+        assert APPROVAL_INDEX.search(plan), f"{name}:\n{statement}\n{plan}"
+        assert "SCAN approvals" not in plan, f"{name}:\n{statement}\n{plan}"
+
+
+def _pre_series_database(path) -> Engine:
+    """Database file with the schema as first released: no phone_e164, no composite indexes"""
+    old_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=old_engine)
+    with old_engine.begin() as conn:
+        for indexes in SERIES_INDEXES.values():
+            for index_name in indexes:
+                conn.execute(text(f"DROP INDEX {index_name}"))
+        conn.execute(text("ALTER TABLE visitors DROP COLUMN phone_e164"))
+        conn.execute(text(
+            "INSERT INTO visitors (name, phone) VALUES ('Old Visitor', '050-987-6543'), ('Fragment', '12345')"
+        ))
+    return old_engine
+
+
+def test_run_migrations_on_pre_series_database(tmp_path):
+    old_engine = _pre_series_database(tmp_path / "pre-series.db")
+    try:
+        assert run_migrations(old_engine) == [name for name, _ in MIGRATIONS]
+        assert run_migrations(old_engine) == []
+
+        inspector = inspect(old_engine)
+        for table_name, expected in SERIES_INDEXES.items():
+            existing = {index["name"] for index in inspector.get_indexes(table_name)}
+            assert set(expected) <= existing
+
+        with old_engine.connect() as conn:
+            phones = dict(conn.execute(text("SELECT name, phone_e164 FROM visitors")).all())
+        assert phones == {"Old Visitor": "+971509876543", "Fragment": None}
+
+        plan = query_plan(
+            old_engine,
+            "SELECT id FROM approvals WHERE status = ? AND valid_until >= ?",
+            ("approved", "2026-01-01 00:00:00"),
+        )
+        assert APPROVAL_INDEX.search(plan), plan
+    finally:
+        old_engine.dispose()
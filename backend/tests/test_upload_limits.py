@@ -0,0 +1,63 @@
+"""
+Upload size limits are enforced before the multipart body is parsed
+"""
+import pytest
+
+from core import settings
+from core.upload_limit import MULTIPART_OVERHEAD_BYTES
+
+from conftest import face_photo
+
+LIMIT = settings.photo_max_upload_mb * 1024 * 1024
+
+
+def _auth_headers(client) -> dict:
+    token = client.post(
+        "/api/auth/login", json={"phone": "+971501234567", "user_type": "resident"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _chunked(body: bytes, chunk_size: int = 1024 * 1024):
+    for i in range(0, len(body), chunk_size):
+        yield body[i:i + chunk_size]
+
+
+@pytest.mark.parametrize("path", ["/api/face/detect", "/api/face/identify"])
+def test_declared_oversize_body_rejected_before_reading(client, path):
+    response = client.post(
+        path,
+        content=b"",
+        headers={
+            "Content-Type": "multipart/form-data; boundary=x",
+            "Content-Length": str(LIMIT + MULTIPART_OVERHEAD_BYTES + 1),
+        },
+    )
+    assert response.status_code == 413
+
+
+def test_chunked_oversize_body_cut_off(client, monkeypatch):
+    from services.photo_manager import photo_manager
+
+    async def never_called(*args, **kwargs):
+        raise AssertionError("body reached the endpoint")
+
+    monkeypatch.setattr(photo_manager, "store_upload", never_called)
+    body = (
+        b"--x\r\nContent-Disposition: form-data; name=\"photo\"; filename=\"a.jpg\"\r\n"
+        b"Content-Type: image/jpeg\r\n\r\n" + b"\0" * (LIMIT + MULTIPART_OVERHEAD_BYTES) + b"\r\n--x--\r\n"
+    )
+    response = client.post(
+        "/api/auth/upload-photo",
+        content=_chunked(body),
+        headers={"Content-Type": "multipart/form-data; boundary=x", **_auth_headers(client)},
+    )
+    assert response.status_code == 413
+
+
+def test_upload_within_limit_accepted(client, stub_cascade):
+    response = client.post(
+        "/api/face/detect", files={"photo": ("photo.jpg", face_photo((30, 90, 200)), "image/jpeg")}
+    )
+    assert response.status_code == 200
+    assert response.json()["detected"] is True
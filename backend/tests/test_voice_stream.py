@@ -0,0 +1,48 @@
+"""
+/api/voice/stream keeps its database work off the event loop
+"""
+import threading
+
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import api.voice as voice_api
+
+
+def _record_threads(monkeypatch, name: str) -> list:
+    threads = []
+    original = getattr(voice_api, name)
+
+    def recording(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(voice_api, name, recording)
+    return threads
+
+
+def test_stream_db_work_runs_in_threadpool(client, monkeypatch):
+    lookups = _record_threads(monkeypatch, "_resident_exists")
+    responses = _record_threads(monkeypatch, "_voice_response")
+
+    pcm = (np.sin(np.arange(16000) / 8) * 8000).astype("<i2").tobytes()
+    with client.websocket_connect("/api/voice/stream?resident_id=1") as websocket:
+        assert websocket.receive_json()["type"] == "ready"
+        websocket.send_bytes(pcm)
+        websocket.send_json({"type": "end"})
+        while True:
+            message = websocket.receive_json()
+            if message["type"] == "final":
+                break
+
+    assert message["success"]
+    assert lookups and responses
+    event_loop_thread = client.portal.call(threading.current_thread)
+    assert event_loop_thread not in lookups + responses
+
+
+def test_stream_unknown_resident_is_rejected(client):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/voice/stream?resident_id=999999") as websocket:
+            websocket.receive_json()
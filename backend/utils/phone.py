@@ -0,0 +1,83 @@
+"""
+Phone number normalization to E.164
+Lets "+971 50 123 4567", "00971501234567" and "050-123-4567" resolve to the same visitor
+"""
+import re
+from typing import Optional
+
+from core import settings
+
+# Characters guards type between digits
+PHONE_QUERY_PATTERN = re.compile(r'^\+?[\d\s\-().]+$')
+
+# E.164 numbers carry at most 15 digits; anything under 8 is a partial number
+MIN_E164_DIGITS = 8
+MAX_E164_DIGITS = 15
+
+# Digits after a trunk "0" or bare country code; fewer is a fragment, not a number
+MIN_NATIONAL_DIGITS = 7
+
+
+def normalize_phone(raw: Optional[str], country_code: Optional[str] = None) -> Optional[str]:
+    """
+    Normalize a phone number to E.164 ("+971501234567").
+
+    Numbers need an international prefix ("+" or "00"), a trunk "0" or
+    `country_code` itself typed without the "+" ("971501234567"); the
+    last two are numbers in `country_code` (default:
+    settings.default_country_code). Other bare digit runs such as
+    "1234567" are fragments, not numbers.
+
+    Returns:
+        E.164 string, or None if `raw` is empty or not a complete number
+    """
+    if not raw:
+        return None
+
+    raw = raw.strip()
+    if not PHONE_QUERY_PATTERN.match(raw):
+        return None
+
+    country_code = country_code or settings.default_country_code
+    digits = re.sub(r'\D', '', raw)
+
+    if raw.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        national = digits[1:]
+        if len(national) < MIN_NATIONAL_DIGITS:
+            return None
+        digits = country_code + national
+    elif digits.startswith(country_code) and len(digits) - len(country_code) >= MIN_NATIONAL_DIGITS:
+        pass
+    else:
+        return None
+
+    if not MIN_E164_DIGITS <= len(digits) <= MAX_E164_DIGITS:
+        return None
+
+    return f"+{digits}"
+
+
+def phone_search_digits(query: str) -> Optional[str]:
+    """
+    Digits of a (possibly partial) phone query as they appear in E.164 form:
+    "050-987" -> "50987", "+971 50" -> "97150", "9876543" -> "9876543".
+
+    Returns:
+        Digit string, or None if `query` is not phone-like
+    """
+    query = query.strip()
+    if not PHONE_QUERY_PATTERN.match(query):
+        return None
+
+    digits = re.sub(r'\D', '', query)
+    if query.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    return digits or None